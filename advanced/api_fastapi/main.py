@@ -6,7 +6,9 @@ and concentration repair using modern portfolio theory and risk constraints.
 """
 
 from typing import Dict, List, Optional, Any
+import json
 import logging
+from collections import OrderedDict, defaultdict
 from datetime import datetime
 
 import numpy as np
@@ -20,6 +22,11 @@ from scipy.optimize import minimize
 
 from advanced.utils.mlflow_logger import log_optimization_run
 
+try:
+    from yaml import CSafeLoader as _YAML_LOADER
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as _YAML_LOADER
+
 # Initialize logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -69,6 +76,17 @@ class ConcentrationRepairRequest(BaseModel):
     country_caps: Optional[Dict[str, float]] = Field(None, description="Country concentration limits")
 
 
+def _parse_policies(text: str) -> Dict[str, Any]:
+    """Parse policy text, taking a JSON fast path when the file is plain JSON"""
+    # JSON is a subset of YAML, so JSON-formatted policies can skip the YAML parser
+    if text.lstrip().startswith("{"):
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            pass
+    return yaml.load(text, Loader=_YAML_LOADER)
+
+
 def load_policies() -> Dict[str, Any]:
     """Load policy configurations from YAML file"""
     global POLICIES, SECTOR_MAP, COUNTRY_MAP
@@ -76,7 +94,7 @@ def load_policies() -> Dict[str, Any]:
     if POLICIES is None:
         try:
             with open("docs/policies.yaml", "r") as f:
-                POLICIES = yaml.safe_load(f)
+                POLICIES = _parse_policies(f.read())
             
             # Load mapping files
             SECTOR_MAP = pd.read_csv("docs/sector_map.csv").set_index("symbol")["sector"].to_dict()
@@ -129,64 +147,118 @@ def estimate_mu_sigma(returns_data: pd.DataFrame, lookback: int = 252) -> tuple:
 
 def compute_hhi(weights: Dict[str, float]) -> float:
     """Compute Herfindahl-Hirschman Index for concentration measurement"""
-    weight_array = np.array(list(weights.values()))
-    return np.sum(weight_array ** 2)
+    weight_array = np.fromiter(weights.values(), dtype=np.float64, count=len(weights))
+    return float(weight_array @ weight_array)
+
+
+def _group_indices(assets: List[str], mapping: Dict[str, str],
+                   caps: Dict[str, float]) -> Dict[str, np.ndarray]:
+    """Bucket asset positions by capped group (sector/country) in one pass"""
+    buckets = defaultdict(list)
+    for i, asset in enumerate(assets):
+        group = mapping.get(asset)
+        if group in caps:
+            buckets[group].append(i)
+    
+    return {group: np.array(indices) for group, indices in buckets.items()}
 
 
-def concentration_repair(weights: Dict[str, float], max_concentration: float = 0.05,
-                        sector_caps: Optional[Dict[str, float]] = None,
-                        country_caps: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+# Parametrised repair problems keyed by structure (asset count and capped
+# group members), so OSQP can warm-start from the previous solve
+_REPAIR_PROBLEMS: OrderedDict = OrderedDict()
+_REPAIR_PROBLEMS_MAXSIZE = 32
+
+
+def _repair_problem(n: int, groups: tuple) -> tuple:
     """
-    Repair portfolio concentration violations using quadratic optimization
+    Get or build the parametrised concentration repair problem
+    
+    Args:
+        n: Number of assets
+        groups: Member index tuples of the capped sectors and countries
+        
+    Returns:
+        Tuple of (problem, weights variable, original weights parameter,
+        asset cap parameter, group caps parameter or None)
     """
-    assets = list(weights.keys())
-    w0 = np.array(list(weights.values()))
-    n = len(assets)
+    key = (n, groups)
+    entry = _REPAIR_PROBLEMS.get(key)
+    if entry is not None:
+        _REPAIR_PROBLEMS.move_to_end(key)
+        return entry
     
-    # Decision variables
     w = cp.Variable(n, name="weights")
+    w0 = cp.Parameter(n, name="original_weights")
+    cap = cp.Parameter(name="max_concentration")
+    group_caps = cp.Parameter(len(groups), name="group_caps") if groups else None
     
     # Objective: minimize deviation from original weights
     objective = cp.Minimize(cp.sum_squares(w - w0))
     
-    # Constraints
     constraints = [
         cp.sum(w) == 1,  # Fully invested
         w >= 0,  # Long-only
-        w <= max_concentration,  # Individual asset limits
+        w <= cap,  # Individual asset limits
     ]
     
-    # Sector constraints
+    # Sector and country constraints
+    for j, members in enumerate(groups):
+        constraints.append(cp.sum(w[list(members)]) <= group_caps[j])
+    
+    entry = (cp.Problem(objective, constraints), w, w0, cap, group_caps)
+    _REPAIR_PROBLEMS[key] = entry
+    if len(_REPAIR_PROBLEMS) > _REPAIR_PROBLEMS_MAXSIZE:
+        _REPAIR_PROBLEMS.popitem(last=False)
+    
+    return entry
+
+
+def concentration_repair(weights: Dict[str, float], max_concentration: float = 0.05,
+                        sector_caps: Optional[Dict[str, float]] = None,
+                        country_caps: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """
+    Repair portfolio concentration violations using quadratic optimization
+    """
+    assets = list(weights.keys())
+    w0 = np.fromiter(weights.values(), dtype=np.float64, count=len(weights))
+    n = len(assets)
+    
+    # Capped groups: sectors first, then countries
+    groups, caps = [], []
     if sector_caps and SECTOR_MAP:
-        for sector, cap in sector_caps.items():
-            sector_assets = [i for i, asset in enumerate(assets) 
-                           if SECTOR_MAP.get(asset) == sector]
-            if sector_assets:
-                constraints.append(cp.sum(w[sector_assets]) <= cap)
+        for sector, sector_assets in _group_indices(assets, SECTOR_MAP, sector_caps).items():
+            groups.append(tuple(sector_assets.tolist()))
+            caps.append(sector_caps[sector])
     
-    # Country constraints
     if country_caps and COUNTRY_MAP:
-        for country, cap in country_caps.items():
-            country_assets = [i for i, asset in enumerate(assets) 
-                            if COUNTRY_MAP.get(asset) == country]
-            if country_assets:
-                constraints.append(cp.sum(w[country_assets]) <= cap)
+        for country, country_assets in _group_indices(assets, COUNTRY_MAP, country_caps).items():
+            groups.append(tuple(country_assets.tolist()))
+            caps.append(country_caps[country])
     
-    # Solve optimization
-    problem = cp.Problem(objective, constraints)
+    # Only the parameter values change between calls with the same structure
+    problem, w, w0_param, cap_param, group_caps_param = _repair_problem(n, tuple(groups))
+    w0_param.value = w0
+    cap_param.value = max_concentration
+    if group_caps_param is not None:
+        group_caps_param.value = np.array(caps, dtype=np.float64)
     
     try:
-        problem.solve(solver=cp.ECOS)
+        problem.solve(solver=cp.OSQP, warm_start=True, verbose=False,
+                      eps_abs=1e-7, eps_rel=1e-7, polish=True)
         
-        if problem.status == cp.OPTIMAL:
-            repaired_weights = {asset: float(w.value[i]) for i, asset in enumerate(assets)}
+        if problem.status in (cp.OPTIMAL, cp.OPTIMAL_INACCURATE):
+            # An inaccurate solution can overshoot the bounds slightly, so pull
+            # it back onto [0, max_concentration] and renormalise
+            repaired = np.clip(w.value, 0.0, max_concentration)
+            repaired /= repaired.sum()
+            repaired_weights = dict(zip(assets, repaired.tolist()))
             logger.info(f"Concentration repair completed. HHI: {compute_hhi(repaired_weights):.4f}")
             return repaired_weights
         else:
             logger.error(f"Optimization failed with status: {problem.status}")
             return weights
             
-    except Exception as e:
+    except cp.error.SolverError as e:
         logger.error(f"Concentration repair failed: {e}")
         return weights
 
@@ -270,7 +342,8 @@ async def optimize_portfolio(request: OptimizationRequest):
     """Optimize portfolio using mean-variance optimization"""
     try:
         # Convert inputs
-        mu = np.array([request.expected_returns[asset] for asset in request.assets])
+        mu = np.fromiter((request.expected_returns[asset] for asset in request.assets),
+                         dtype=np.float64, count=len(request.assets))
         sigma = np.array(request.covariance_matrix)
         
         # Validate inputs
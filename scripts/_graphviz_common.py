@@ -0,0 +1,133 @@
+"""
+Shared Graphviz settings for the diagram generation scripts.
+
+Keeps the color palette and the default graph/node/edge attributes in one
+place so every diagram is configured the same way.
+"""
+
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+# Color palette shared by all diagrams
+COLORS = {
+    # Architecture layers
+    'api': '#E3F2FD',           # Light blue
+    'data': '#F3E5F5',          # Light purple
+    'ml': '#E8F5E8',            # Light green
+    'storage': '#FFF3E0',       # Light orange
+    'frontend': '#FCE4EC',      # Light pink
+    'external': '#F5F5F5',      # Light gray
+
+    # dbt / feature store layers
+    'source': '#FFEBEE',        # Light red for sources
+    'bronze': '#FFF3E0',        # Light orange for raw data
+    'silver': '#F3E5F5',        # Light purple for features
+    'gold': '#E8F5E8',          # Light green for aggregated
+    'feast': '#E3F2FD',         # Light blue for Feast
+    'serving': '#FCE4EC',       # Light pink for serving
+
+    # Feature lineage stages
+    'raw': '#FFCDD2',
+    'calc': '#F8BBD9',
+    'normalize': '#E1BEE7',
+    'composite': '#C5CAE9',
+    'output': '#BBDEFB',
+}
+
+
+def dot_quote(text: str) -> str:
+    """Quote a string as a DOT identifier, escaping newlines and quotes"""
+    return '"' + text.replace('"', '\\"').replace('\n', '\\n') + '"'
+
+
+def base_digraph(name: str, comment: str, rankdir: str = 'TB', size: str = '12,10',
+                 engine: str = 'dot', node_attrs: Optional[Dict[str, str]] = None,
+                 edge_attrs: Optional[Dict[str, str]] = None):
+    """
+    Create a Digraph with the default graph, node and edge attributes
+
+    Args:
+        name: Graph name
+        comment: Comment written at the top of the DOT source
+        rankdir: Layout direction
+        size: Maximum drawing size in inches
+        engine: Graphviz layout engine
+        node_attrs: Node attributes overriding the defaults
+        edge_attrs: Edge attributes overriding the defaults
+
+    Returns:
+        Configured graphviz.Digraph
+    """
+    import graphviz
+
+    dot = graphviz.Digraph(name, comment=comment, format='svg', engine=engine)
+    dot.attr(rankdir=rankdir, size=size)
+    dot.attr('node', **{'shape': 'box', 'style': 'rounded,filled', 'fontname': 'Arial',
+                        **(node_attrs or {})})
+    dot.attr('edge', **{'fontname': 'Arial', 'fontsize': '10', **(edge_attrs or {})})
+
+    return dot
+
+
+def render_dot(source: str, output_path: Path, fmt: str = 'svg', engine: Optional[str] = None) -> Path:
+    """
+    Render DOT source by piping it to Graphviz over stdin
+
+    Unlike ``graphviz.Digraph.render`` this never writes an intermediate
+    ``.dot`` file, so the only file touched is the rendered output.
+
+    Args:
+        source: DOT source text
+        output_path: Output path without extension
+        fmt: Output format (svg, png, ...)
+        engine: Graphviz layout engine; if omitted, the graph's ``layout``
+            attribute (or dot) is used
+
+    Returns:
+        Path of the rendered file
+    """
+    out = Path(f"{output_path}.{fmt}")
+    cmd = ['dot', f'-T{fmt}', '-o', str(out)]
+    if engine:
+        cmd.insert(1, f'-K{engine}')
+    subprocess.run(cmd, input=source, text=True, check=True)
+    
+    return out
+
+
+def render_dot_batch(sources: Dict[str, str], output_dir: Path, fmt: str = 'svg') -> List[Path]:
+    """
+    Render several DOT sources with a single Graphviz process
+
+    Each source is written to a temporary directory and all of them are passed
+    to one ``dot -O`` call, so Graphviz starts once instead of once per diagram.
+    Every graph is laid out with its own ``layout`` attribute (dot by default).
+
+    Args:
+        sources: Mapping of output name (without extension) to DOT source text
+        output_dir: Directory receiving the rendered files
+        fmt: Output format (svg, png, ...)
+
+    Returns:
+        Paths of the rendered files, in the order of ``sources``
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        dot_paths = []
+        for name, source in sources.items():
+            dot_path = Path(tmp) / f"{name}.gv"
+            dot_path.write_text(source)
+            dot_paths.append(dot_path)
+        
+        subprocess.run(['dot', f'-T{fmt}', '-O', *map(str, dot_paths)], check=True)
+        
+        outputs = []
+        for name, dot_path in zip(sources, dot_paths):
+            out = output_dir / f"{name}.{fmt}"
+            shutil.move(f"{dot_path}.{fmt}", out)
+            outputs.append(out)
+    
+    return outputs
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Generate the architecture and dbt/Feature Store diagrams in one run.
+
+This script collects the diagram factories from generate_architecture.py and
+generate_dbt_featurestore_flow.py and renders all of them with a single
+Graphviz process instead of one per diagram.
+"""
+
+import argparse
+import os
+from pathlib import Path
+
+from _graphviz_common import render_dot_batch
+from generate_architecture import create_architecture_diagram, create_data_flow_diagram
+from generate_dbt_featurestore_flow import (
+    create_dbt_featurestore_flow,
+    create_feature_lineage_diagram,
+)
+
+
+# Output name -> diagram factory
+FACTORIES = {
+    'architecture': create_architecture_diagram,
+    'data_flow': create_data_flow_diagram,
+    'dbt_featurestore_flow': create_dbt_featurestore_flow,
+    'feature_lineage': create_feature_lineage_diagram,
+}
+
+
+def _dot_source(diagram):
+    """Return DOT text for a graphviz object or an already rendered DOT string"""
+    return diagram if isinstance(diagram, str) else diagram.source
+
+
+def main():
+    """Generate and save all architecture and dbt diagrams"""
+    
+    parser = argparse.ArgumentParser(description="Generate all architecture and dbt diagrams")
+    parser.add_argument(
+        "--png",
+        action="store_true",
+        help="Render PNG instead of the default SVG (for tools that need raster images)"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Print the DOT sources without rendering them"
+    )
+    args = parser.parse_args()
+    fmt = 'png' if args.png else 'svg'
+    
+    sources = {name: _dot_source(factory()) for name, factory in FACTORIES.items()}
+    
+    if args.dry_run:
+        for source in sources.values():
+            print(source)
+        return
+    
+    # Create and validate the output directory before rendering
+    output_dir = Path('docs/images')
+    try:
+        output_dir.mkdir(parents=True, exist_ok=True)
+    except OSError as e:
+        print(f"❌ Cannot create output directory {output_dir}: {e}")
+        return
+    if not os.access(output_dir, os.W_OK):
+        print(f"❌ Output directory {output_dir} is not writable")
+        return
+    
+    print(f"Generating {len(sources)} diagrams...")
+    
+    try:
+        for out in render_dot_batch(sources, output_dir, fmt):
+            print(f"✅ Diagram saved to {out}")
+        
+        print("\n📊 Architecture and dbt diagrams generated successfully!")
+        
+    except Exception as e:
+        print(f"❌ Error generating diagrams: {e}")
+        print("Make sure Graphviz is installed: pip install graphviz")
+        print("And system Graphviz: apt-get install graphviz (Ubuntu) or brew install graphviz (Mac)")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -6,167 +6,175 @@ This script creates a visual representation of the Financial Decision Engine
 architecture showing the relationships between components.
 """
 
+import argparse
 import os
+from functools import lru_cache
 from pathlib import Path
-import graphviz
 
+from _graphviz_common import COLORS, base_digraph, render_dot
 
-def create_architecture_diagram():
-    """Create the main system architecture diagram"""
-    
-    # Create a directed graph
-    dot = graphviz.Digraph(
-        'financial_decision_engine_architecture',
-        comment='Financial Decision Engine Architecture',
-        format='png'
-    )
-    
-    # Set graph attributes
-    dot.attr(rankdir='TB', size='12,10', dpi='300')
-    dot.attr('node', shape='box', style='rounded,filled', fontname='Arial')
-    dot.attr('edge', fontname='Arial', fontsize='10')
-    
-    # Define color scheme
-    colors = {
-        'api': '#E3F2FD',           # Light blue
-        'data': '#F3E5F5',          # Light purple  
-        'ml': '#E8F5E8',            # Light green
-        'storage': '#FFF3E0',       # Light orange
-        'frontend': '#FCE4EC',      # Light pink
-        'external': '#F5F5F5'       # Light gray
-    }
-    
+
+# Diagram data is static, so it is built once at import time
+
+# (cluster name, label, ((node id, label, color key), ...))
+_ARCH_CLUSTERS = (
     # Frontend Layer
-    with dot.subgraph(name='cluster_frontend') as frontend:
-        frontend.attr(label='Frontend Layer', style='filled', color='lightgray')
-        frontend.node('streamlit', 'Streamlit Demo\nApp', fillcolor=colors['frontend'])
-        frontend.node('jupyter', 'Jupyter\nNotebooks', fillcolor=colors['frontend'])
-        frontend.node('reports', 'Generated\nReports', fillcolor=colors['frontend'])
+    ('frontend', 'Frontend Layer', (
+        ('streamlit', 'Streamlit Demo\nApp', 'frontend'),
+        ('jupyter', 'Jupyter\nNotebooks', 'frontend'),
+        ('reports', 'Generated\nReports', 'frontend'),
+    )),
     
     # API Layer
-    with dot.subgraph(name='cluster_api') as api:
-        api.attr(label='API Layer', style='filled', color='lightgray')
-        api.node('fastapi', 'FastAPI\nService', fillcolor=colors['api'])
-        api.node('endpoints', 'REST Endpoints:\n/optimize\n/repair-concentration\n/risk-metrics', 
-                fillcolor=colors['api'])
+    ('api', 'API Layer', (
+        ('fastapi', 'FastAPI\nService', 'api'),
+        ('endpoints', 'REST Endpoints:\n/optimize\n/repair-concentration\n/risk-metrics', 'api'),
+    )),
     
     # Core Engine
-    with dot.subgraph(name='cluster_engine') as engine:
-        engine.attr(label='Portfolio Optimization Engine', style='filled', color='lightgray')
-        engine.node('optimizer', 'Mean-Variance\nOptimizer', fillcolor=colors['ml'])
-        engine.node('risk_mgmt', 'Risk Management\n& HHI Repair', fillcolor=colors['ml'])
-        engine.node('factor_model', 'Factor Models\n& Tilts', fillcolor=colors['ml'])
+    ('engine', 'Portfolio Optimization Engine', (
+        ('optimizer', 'Mean-Variance\nOptimizer', 'ml'),
+        ('risk_mgmt', 'Risk Management\n& HHI Repair', 'ml'),
+        ('factor_model', 'Factor Models\n& Tilts', 'ml'),
+    )),
     
     # Data Processing
-    with dot.subgraph(name='cluster_data') as data:
-        data.attr(label='Data Processing Layer', style='filled', color='lightgray')
-        data.node('dbt', 'dbt Models\n(Feature Engineering)', fillcolor=colors['data'])
-        data.node('feast', 'Feast\nFeature Store', fillcolor=colors['data'])
-        data.node('rag', 'RAG System\n(Document Retrieval)', fillcolor=colors['data'])
+    ('data', 'Data Processing Layer', (
+        ('dbt', 'dbt Models\n(Feature Engineering)', 'data'),
+        ('feast', 'Feast\nFeature Store', 'data'),
+        ('rag', 'RAG System\n(Document Retrieval)', 'data'),
+    )),
     
     # Storage Layer
-    with dot.subgraph(name='cluster_storage') as storage:
-        storage.attr(label='Storage Layer', style='filled', color='lightgray')
-        storage.node('postgres', 'PostgreSQL\n+ pgvector', fillcolor=colors['storage'])
-        storage.node('mlflow_store', 'MLflow\nExperiment Store', fillcolor=colors['storage'])
-        storage.node('redis', 'Redis\nCache', fillcolor=colors['storage'])
+    ('storage', 'Storage Layer', (
+        ('postgres', 'PostgreSQL\n+ pgvector', 'storage'),
+        ('mlflow_store', 'MLflow\nExperiment Store', 'storage'),
+        ('redis', 'Redis\nCache', 'storage'),
+    )),
     
     # External Data Sources
-    with dot.subgraph(name='cluster_external') as external:
-        external.attr(label='External Data Sources', style='filled', color='lightgray')
-        external.node('bigquery', 'BigQuery\n(Market Data)', fillcolor=colors['external'])
-        external.node('market_data', 'Market Data\nProviders', fillcolor=colors['external'])
-        external.node('fundamental', 'Fundamental\nData', fillcolor=colors['external'])
+    ('external', 'External Data Sources', (
+        ('bigquery', 'BigQuery\n(Market Data)', 'external'),
+        ('market_data', 'Market Data\nProviders', 'external'),
+        ('fundamental', 'Fundamental\nData', 'external'),
+    )),
     
     # MLOps & Monitoring
-    with dot.subgraph(name='cluster_mlops') as mlops:
-        mlops.attr(label='MLOps & Monitoring', style='filled', color='lightgray')
-        mlops.node('mlflow', 'MLflow\nTracking', fillcolor=colors['ml'])
-        mlops.node('monitoring', 'Performance\nMonitoring', fillcolor=colors['ml'])
-        mlops.node('ci_cd', 'CI/CD Pipeline\n(GitHub Actions)', fillcolor=colors['ml'])
-    
-    # Define connections
-    connections = [
-        # Frontend to API
-        ('streamlit', 'fastapi'),
-        ('jupyter', 'fastapi'),
-        ('reports', 'fastapi'),
-        
-        # API to Engine
-        ('fastapi', 'endpoints'),
-        ('endpoints', 'optimizer'),
-        ('endpoints', 'risk_mgmt'),
-        ('endpoints', 'factor_model'),
-        
-        # Engine to Data
-        ('optimizer', 'feast'),
-        ('risk_mgmt', 'feast'),
-        ('factor_model', 'feast'),
-        ('rag', 'fastapi'),
-        
-        # Data Processing
-        ('dbt', 'feast'),
-        ('bigquery', 'dbt'),
-        ('market_data', 'dbt'),
-        ('fundamental', 'dbt'),
-        
-        # Storage connections
-        ('feast', 'postgres'),
-        ('rag', 'postgres'),
-        ('dbt', 'postgres'),
-        ('fastapi', 'redis'),
-        
-        # MLOps connections
-        ('optimizer', 'mlflow'),
-        ('risk_mgmt', 'mlflow'),
-        ('mlflow', 'mlflow_store'),
-        ('ci_cd', 'fastapi'),
-        ('monitoring', 'fastapi'),
-    ]
-    
-    # Add edges
-    for src, dst in connections:
-        dot.edge(src, dst)
+    ('mlops', 'MLOps & Monitoring', (
+        ('mlflow', 'MLflow\nTracking', 'ml'),
+        ('monitoring', 'Performance\nMonitoring', 'ml'),
+        ('ci_cd', 'CI/CD Pipeline\n(GitHub Actions)', 'ml'),
+    )),
+)
+
+_ARCH_CONNECTIONS = (
+    # Frontend to API
+    ('streamlit', 'fastapi'),
+    ('jupyter', 'fastapi'),
+    ('reports', 'fastapi'),
+    
+    # API to Engine
+    ('fastapi', 'endpoints'),
+    ('endpoints', 'optimizer'),
+    ('endpoints', 'risk_mgmt'),
+    ('endpoints', 'factor_model'),
+    
+    # Engine to Data
+    ('optimizer', 'feast'),
+    ('risk_mgmt', 'feast'),
+    ('factor_model', 'feast'),
+    ('rag', 'fastapi'),
+    
+    # Data Processing
+    ('dbt', 'feast'),
+    ('bigquery', 'dbt'),
+    ('market_data', 'dbt'),
+    ('fundamental', 'dbt'),
+    
+    # Storage connections
+    ('feast', 'postgres'),
+    ('rag', 'postgres'),
+    ('dbt', 'postgres'),
+    ('fastapi', 'redis'),
+    
+    # MLOps connections
+    ('optimizer', 'mlflow'),
+    ('risk_mgmt', 'mlflow'),
+    ('mlflow', 'mlflow_store'),
+    ('ci_cd', 'fastapi'),
+    ('monitoring', 'fastapi'),
+)
+
+# Data flow stages: (node id, label, color)
+_FLOW_STAGES = (
+    ('raw_data', 'Raw Market\nData', '#FFCDD2'),
+    ('feature_eng', 'Feature\nEngineering', '#F8BBD9'),
+    ('feature_store', 'Feature\nStore', '#E1BEE7'),
+    ('optimization', 'Portfolio\nOptimization', '#C5CAE9'),
+    ('risk_mgmt', 'Risk\nManagement', '#BBDEFB'),
+    ('output', 'Portfolio\nWeights', '#B2DFDB'),
+)
+
+# Data flow connections: (src, dst, label)
+_FLOW_CONNECTIONS = (
+    ('raw_data', 'feature_eng', 'dbt transforms'),
+    ('feature_eng', 'feature_store', 'Feast storage'),
+    ('feature_store', 'optimization', 'retrieve features'),
+    ('optimization', 'risk_mgmt', 'initial weights'),
+    ('risk_mgmt', 'output', 'final weights'),
+)
+
+
+# Diagram definitions are static, so build each one once per process.
+# Callers share the returned object and must not modify it.
+@lru_cache(maxsize=1)
+def create_architecture_diagram():
+    """Create the main system architecture diagram"""
+    
+    # Create a directed graph
+    dot = base_digraph(
+        'financial_decision_engine_architecture',
+        'Financial Decision Engine Architecture',
+        rankdir='TB',
+        size='12,10'
+    )
+    
+    for cluster, cluster_label, nodes in _ARCH_CLUSTERS:
+        with dot.subgraph(name=f'cluster_{cluster}') as sub:
+            sub.attr(label=cluster_label, style='filled', color='lightgray')
+            for node_id, label, color_key in nodes:
+                sub.node(node_id, label, fillcolor=COLORS[color_key])
+    
+    # Add edges, skipping duplicate (src, dst) pairs. These edges carry no
+    # attributes, so write the DOT lines straight into the body in one call.
+    dot.body.extend(f'\t{src} -> {dst}\n' for src, dst in dict.fromkeys(_ARCH_CONNECTIONS))
     
     return dot
 
 
+# Diagram definitions are static, so build each one once per process.
+# Callers share the returned object and must not modify it.
+@lru_cache(maxsize=1)
 def create_data_flow_diagram():
     """Create a data flow diagram"""
     
-    dot = graphviz.Digraph(
+    dot = base_digraph(
         'data_flow',
-        comment='Data Flow Diagram',
-        format='png'
+        'Data Flow Diagram',
+        rankdir='LR',
+        size='14,8',
+        node_attrs={'shape': 'ellipse', 'style': 'filled'}
     )
     
-    dot.attr(rankdir='LR', size='14,8', dpi='300')
-    dot.attr('node', shape='ellipse', style='filled', fontname='Arial')
-    dot.attr('edge', fontname='Arial', fontsize='10')
-    
-    # Data flow stages
-    stages = [
-        ('raw_data', 'Raw Market\nData', '#FFCDD2'),
-        ('feature_eng', 'Feature\nEngineering', '#F8BBD9'),
-        ('feature_store', 'Feature\nStore', '#E1BEE7'),
-        ('optimization', 'Portfolio\nOptimization', '#C5CAE9'),
-        ('risk_mgmt', 'Risk\nManagement', '#BBDEFB'),
-        ('output', 'Portfolio\nWeights', '#B2DFDB'),
-    ]
-    
-    for node_id, label, color in stages:
+    for node_id, label, color in _FLOW_STAGES:
         dot.node(node_id, label, fillcolor=color)
     
-    # Add connections with labels
-    flow_connections = [
-        ('raw_data', 'feature_eng', 'dbt transforms'),
-        ('feature_eng', 'feature_store', 'Feast storage'),
-        ('feature_store', 'optimization', 'retrieve features'),
-        ('optimization', 'risk_mgmt', 'initial weights'),
-        ('risk_mgmt', 'output', 'final weights'),
-    ]
+    # Collapse parallel edges between the same pair, keeping the first label
+    edge_labels = {}
+    for src, dst, label in _FLOW_CONNECTIONS:
+        edge_labels.setdefault((src, dst), label)
     
-    for src, dst, label in flow_connections:
+    for (src, dst), label in edge_labels.items():
         dot.edge(src, dst, label=label)
     
     return dot
@@ -175,28 +183,48 @@ def create_data_flow_diagram():
 def main():
     """Generate and save architecture diagrams"""
     
-    # Create output directory
+    parser = argparse.ArgumentParser(description="Generate architecture diagrams")
+    parser.add_argument(
+        "--png",
+        action="store_true",
+        help="Render PNG instead of the default SVG (for tools that need raster images)"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Print the DOT sources without rendering them"
+    )
+    args = parser.parse_args()
+    fmt = 'png' if args.png else 'svg'
+    
+    if args.dry_run:
+        print(create_architecture_diagram().source)
+        print(create_data_flow_diagram().source)
+        return
+    
+    # Create and validate the output directory before building any diagram
     output_dir = Path('docs/images')
-    output_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        output_dir.mkdir(parents=True, exist_ok=True)
+    except OSError as e:
+        print(f"❌ Cannot create output directory {output_dir}: {e}")
+        return
+    if not os.access(output_dir, os.W_OK):
+        print(f"❌ Output directory {output_dir} is not writable")
+        return
     
     print("Generating Financial Decision Engine architecture diagrams...")
     
     try:
         # Generate main architecture diagram
         arch_diagram = create_architecture_diagram()
-        arch_diagram.render(
-            str(output_dir / 'architecture'),
-            cleanup=True
-        )
-        print(f"✅ Architecture diagram saved to {output_dir / 'architecture.png'}")
+        render_dot(arch_diagram.source, output_dir / 'architecture', fmt, arch_diagram.engine)
+        print(f"✅ Architecture diagram saved to {output_dir / f'architecture.{fmt}'}")
         
         # Generate data flow diagram
         flow_diagram = create_data_flow_diagram()
-        flow_diagram.render(
-            str(output_dir / 'data_flow'),
-            cleanup=True
-        )
-        print(f"✅ Data flow diagram saved to {output_dir / 'data_flow.png'}")
+        render_dot(flow_diagram.source, output_dir / 'data_flow', fmt, flow_diagram.engine)
+        print(f"✅ Data flow diagram saved to {output_dir / f'data_flow.{fmt}'}")
         
         print("\n📊 Architecture diagrams generated successfully!")
         print("These diagrams show:")
@@ -6,276 +6,315 @@ This script creates a detailed visualization of the data flow through
 dbt models to the Feast feature store.
 """
 
+import argparse
 import os
+from functools import lru_cache
 from pathlib import Path
-import graphviz
 
+from _graphviz_common import COLORS, dot_quote, render_dot
 
-def create_dbt_featurestore_flow():
-    """Create comprehensive dbt to feature store flow diagram"""
-    
-    dot = graphviz.Digraph(
-        'dbt_featurestore_flow',
-        comment='dbt to Feature Store Flow',
-        format='png'
-    )
-    
-    dot.attr(rankdir='TB', size='16,12', dpi='300')
-    dot.attr('node', shape='box', style='rounded,filled', fontname='Arial', fontsize='9')
-    dot.attr('edge', fontname='Arial', fontsize='8')
-    
-    # Define color scheme for different layers
-    colors = {
-        'source': '#FFEBEE',      # Light red for sources
-        'bronze': '#FFF3E0',      # Light orange for raw data
-        'silver': '#F3E5F5',      # Light purple for features
-        'gold': '#E8F5E8',        # Light green for aggregated
-        'feast': '#E3F2FD',       # Light blue for Feast
-        'serving': '#FCE4EC'      # Light pink for serving
-    }
-    
+
+# Diagram data is static, so it is built once at import time
+
+# (cluster name, label, color key)
+_DBT_CLUSTERS = (
+    ('sources', 'Source Systems', 'source'),
+    ('bronze', 'Bronze Layer (Raw Data)', 'bronze'),
+    ('silver', 'Silver Layer (dbt Feature Models)', 'silver'),
+    ('gold', 'Gold Layer (Feature Aggregations)', 'gold'),
+    ('feast', 'Feast Feature Store', 'feast'),
+    ('serving', 'Feature Serving', 'serving'),
+)
+
+# (cluster, node id, label)
+_DBT_NODES = (
     # Source Systems
-    with dot.subgraph(name='cluster_sources') as sources:
-        sources.attr(label='Source Systems', style='filled', color='lightgray')
-        sources.node('market_api', 'Market Data\nAPI', fillcolor=colors['source'])
-        sources.node('fundamental_api', 'Fundamental\nData API', fillcolor=colors['source'])
-        sources.node('options_feed', 'Options\nData Feed', fillcolor=colors['source'])
-        sources.node('news_api', 'News &\nSentiment API', fillcolor=colors['source'])
-        sources.node('esg_provider', 'ESG Data\nProvider', fillcolor=colors['source'])
+    ('sources', 'market_api', 'Market Data\nAPI'),
+    ('sources', 'fundamental_api', 'Fundamental\nData API'),
+    ('sources', 'options_feed', 'Options\nData Feed'),
+    ('sources', 'news_api', 'News &\nSentiment API'),
+    ('sources', 'esg_provider', 'ESG Data\nProvider'),
     
     # Bronze Layer (Raw Data in BigQuery)
-    with dot.subgraph(name='cluster_bronze') as bronze:
-        bronze.attr(label='Bronze Layer (Raw Data)', style='filled', color='lightgray')
-        bronze.node('raw_prices', 'raw_daily_prices', fillcolor=colors['bronze'])
-        bronze.node('raw_fundamentals', 'raw_financial_ratios', fillcolor=colors['bronze'])
-        bronze.node('raw_options', 'raw_options_data', fillcolor=colors['bronze'])
-        bronze.node('raw_sentiment', 'raw_sentiment_data', fillcolor=colors['bronze'])
-        bronze.node('raw_esg', 'raw_esg_scores', fillcolor=colors['bronze'])
-        bronze.node('raw_macro', 'raw_macro_indicators', fillcolor=colors['bronze'])
+    ('bronze', 'raw_prices', 'raw_daily_prices'),
+    ('bronze', 'raw_fundamentals', 'raw_financial_ratios'),
+    ('bronze', 'raw_options', 'raw_options_data'),
+    ('bronze', 'raw_sentiment', 'raw_sentiment_data'),
+    ('bronze', 'raw_esg', 'raw_esg_scores'),
+    ('bronze', 'raw_macro', 'raw_macro_indicators'),
     
     # Silver Layer (dbt Feature Models)
-    with dot.subgraph(name='cluster_silver') as silver:
-        silver.attr(label='Silver Layer (dbt Feature Models)', style='filled', color='lightgray')
-        silver.node('momentum_model', 'momentum.sql\n1m, 3m, 6m, 12m\nmomentum signals', fillcolor=colors['silver'])
-        silver.node('value_model', 'value.sql\nP/E, P/B, EV/EBITDA\nsector z-scores', fillcolor=colors['silver'])
-        silver.node('liquidity_model', 'liquidity.sql\nvolume, spreads\nAmihud illiquidity', fillcolor=colors['silver'])
-        silver.node('sentiment_model', 'sentiment.sql\nnews, analyst, social\ncomposite scores', fillcolor=colors['silver'])
-        silver.node('betas_model', 'betas.sql\nmarket, factor\nexposures', fillcolor=colors['silver'])
-        silver.node('esg_model', 'esg.sql\nE, S, G scores\ntilt signals', fillcolor=colors['silver'])
-        silver.node('options_model', 'options.sql\nIV, skew, flow\nvolatility signals', fillcolor=colors['silver'])
-        silver.node('macro_model', 'macro.sql\nrates, spreads\nregime classification', fillcolor=colors['silver'])
-        silver.node('earnings_model', 'earnings.sql\nrevisions, surprises\nmomentum scores', fillcolor=colors['silver'])
-        silver.node('credit_model', 'credit_risk.sql\nratings, spreads\ndefault probability', fillcolor=colors['silver'])
-        silver.node('residuals_model', 'idiosyncratic_residuals.sql\nfactor model residuals\nalpha signals', fillcolor=colors['silver'])
-        silver.node('macro_surprise_model', 'macro_surprise.sql\neconomic surprises\nregime indicators', fillcolor=colors['silver'])
+    ('silver', 'momentum_model', 'momentum.sql\n1m, 3m, 6m, 12m\nmomentum signals'),
+    ('silver', 'value_model', 'value.sql\nP/E, P/B, EV/EBITDA\nsector z-scores'),
+    ('silver', 'liquidity_model', 'liquidity.sql\nvolume, spreads\nAmihud illiquidity'),
+    ('silver', 'sentiment_model', 'sentiment.sql\nnews, analyst, social\ncomposite scores'),
+    ('silver', 'betas_model', 'betas.sql\nmarket, factor\nexposures'),
+    ('silver', 'esg_model', 'esg.sql\nE, S, G scores\ntilt signals'),
+    ('silver', 'options_model', 'options.sql\nIV, skew, flow\nvolatility signals'),
+    ('silver', 'macro_model', 'macro.sql\nrates, spreads\nregime classification'),
+    ('silver', 'earnings_model', 'earnings.sql\nrevisions, surprises\nmomentum scores'),
+    ('silver', 'credit_model', 'credit_risk.sql\nratings, spreads\ndefault probability'),
+    ('silver', 'residuals_model', 'idiosyncratic_residuals.sql\nfactor model residuals\nalpha signals'),
+    ('silver', 'macro_surprise_model', 'macro_surprise.sql\neconomic surprises\nregime indicators'),
     
     # Gold Layer (Aggregated Features)
-    with dot.subgraph(name='cluster_gold') as gold:
-        gold.attr(label='Gold Layer (Feature Aggregations)', style='filled', color='lightgray')
-        gold.node('equity_features', 'equity_features\ncombined stock signals', fillcolor=colors['gold'])
-        gold.node('macro_features', 'macro_features\nmarket regime indicators', fillcolor=colors['gold'])
-        gold.node('risk_features', 'risk_features\nfactor exposures', fillcolor=colors['gold'])
+    ('gold', 'equity_features', 'equity_features\ncombined stock signals'),
+    ('gold', 'macro_features', 'macro_features\nmarket regime indicators'),
+    ('gold', 'risk_features', 'risk_features\nfactor exposures'),
     
     # Feast Feature Store
-    with dot.subgraph(name='cluster_feast') as feast:
-        feast.attr(label='Feast Feature Store', style='filled', color='lightgray')
-        feast.node('feast_registry', 'Feature Registry\nentities, views, sources', fillcolor=colors['feast'])
-        feast.node('offline_store', 'Offline Store\n(BigQuery)\nhistorical features', fillcolor=colors['feast'])
-        feast.node('online_store', 'Online Store\n(PostgreSQL)\nreal-time serving', fillcolor=colors['feast'])
+    ('feast', 'feast_registry', 'Feature Registry\nentities, views, sources'),
+    ('feast', 'offline_store', 'Offline Store\n(BigQuery)\nhistorical features'),
+    ('feast', 'online_store', 'Online Store\n(PostgreSQL)\nreal-time serving'),
     
     # Serving Layer
-    with dot.subgraph(name='cluster_serving') as serving:
-        serving.attr(label='Feature Serving', style='filled', color='lightgray')
-        serving.node('fastapi_serving', 'FastAPI\nFeature Serving', fillcolor=colors['serving'])
-        serving.node('optimization_engine', 'Portfolio\nOptimization', fillcolor=colors['serving'])
-        serving.node('risk_engine', 'Risk\nManagement', fillcolor=colors['serving'])
-    
-    # Data Flow Connections
-    
-    # Sources to Bronze
-    source_to_bronze = [
-        ('market_api', 'raw_prices'),
-        ('fundamental_api', 'raw_fundamentals'),
-        ('options_feed', 'raw_options'),
-        ('news_api', 'raw_sentiment'),
-        ('esg_provider', 'raw_esg'),
-        ('market_api', 'raw_macro'),
-    ]
-    
-    # Bronze to Silver (dbt models)
-    bronze_to_silver = [
-        ('raw_prices', 'momentum_model'),
-        ('raw_prices', 'liquidity_model'),
-        ('raw_prices', 'betas_model'),
-        ('raw_fundamentals', 'value_model'),
-        ('raw_fundamentals', 'earnings_model'),
-        ('raw_fundamentals', 'credit_model'),
-        ('raw_sentiment', 'sentiment_model'),
-        ('raw_esg', 'esg_model'),
-        ('raw_options', 'options_model'),
-        ('raw_macro', 'macro_model'),
-        ('raw_macro', 'macro_surprise_model'),
-        ('betas_model', 'residuals_model'),
-    ]
-    
-    # Silver to Gold
-    silver_to_gold = [
-        ('momentum_model', 'equity_features'),
-        ('value_model', 'equity_features'),
-        ('liquidity_model', 'equity_features'),
-        ('sentiment_model', 'equity_features'),
-        ('earnings_model', 'equity_features'),
-        ('credit_model', 'equity_features'),
-        ('esg_model', 'equity_features'),
-        ('options_model', 'equity_features'),
-        ('macro_model', 'macro_features'),
-        ('macro_surprise_model', 'macro_features'),
-        ('betas_model', 'risk_features'),
-        ('residuals_model', 'risk_features'),
-    ]
-    
-    # Gold to Feast
-    gold_to_feast = [
-        ('equity_features', 'feast_registry'),
-        ('macro_features', 'feast_registry'),
-        ('risk_features', 'feast_registry'),
-    ]
-    
-    # Feast internal flow
-    feast_internal = [
-        ('feast_registry', 'offline_store'),
-        ('offline_store', 'online_store'),
-    ]
-    
-    # Feast to Serving
-    feast_to_serving = [
-        ('online_store', 'fastapi_serving'),
-        ('fastapi_serving', 'optimization_engine'),
-        ('fastapi_serving', 'risk_engine'),
-    ]
-    
-    # Add all edges
-    all_connections = (
-        source_to_bronze + bronze_to_silver + silver_to_gold + 
-        gold_to_feast + feast_internal + feast_to_serving
-    )
-    
-    for src, dst in all_connections:
-        dot.edge(src, dst)
-    
-    # Add some special annotations
-    dot.edge('macro_model', 'macro_surprise_model', style='dashed', 
-             label='regime context', fontsize='7')
-    dot.edge('value_model', 'earnings_model', style='dashed',
-             label='fundamental correlation', fontsize='7')
-    
-    return dot
+    ('serving', 'fastapi_serving', 'FastAPI\nFeature Serving'),
+    ('serving', 'optimization_engine', 'Portfolio\nOptimization'),
+    ('serving', 'risk_engine', 'Risk\nManagement'),
+)
 
+# Data Flow Connections
 
-def create_feature_lineage_diagram():
-    """Create a feature lineage diagram for a specific feature"""
-    
-    dot = graphviz.Digraph(
-        'feature_lineage',
-        comment='Feature Lineage Example: Momentum Score',
-        format='png'
-    )
-    
-    dot.attr(rankdir='LR', size='12,8', dpi='300')
-    dot.attr('node', shape='ellipse', style='filled', fontname='Arial', fontsize='10')
-    dot.attr('edge', fontname='Arial', fontsize='9')
-    
-    # Color scheme
-    colors = {
-        'raw': '#FFCDD2',
-        'calc': '#F8BBD9',
-        'normalize': '#E1BEE7',
-        'composite': '#C5CAE9',
-        'output': '#BBDEFB'
-    }
-    
+# Sources to Bronze
+_DBT_SOURCE_TO_BRONZE = (
+    ('market_api', 'raw_prices'),
+    ('fundamental_api', 'raw_fundamentals'),
+    ('options_feed', 'raw_options'),
+    ('news_api', 'raw_sentiment'),
+    ('esg_provider', 'raw_esg'),
+    ('market_api', 'raw_macro'),
+)
+
+# Bronze to Silver (dbt models)
+_DBT_BRONZE_TO_SILVER = (
+    ('raw_prices', 'momentum_model'),
+    ('raw_prices', 'liquidity_model'),
+    ('raw_prices', 'betas_model'),
+    ('raw_fundamentals', 'value_model'),
+    ('raw_fundamentals', 'earnings_model'),
+    ('raw_fundamentals', 'credit_model'),
+    ('raw_sentiment', 'sentiment_model'),
+    ('raw_esg', 'esg_model'),
+    ('raw_options', 'options_model'),
+    ('raw_macro', 'macro_model'),
+    ('raw_macro', 'macro_surprise_model'),
+    ('betas_model', 'residuals_model'),
+)
+
+# Silver to Gold
+_DBT_SILVER_TO_GOLD = (
+    ('momentum_model', 'equity_features'),
+    ('value_model', 'equity_features'),
+    ('liquidity_model', 'equity_features'),
+    ('sentiment_model', 'equity_features'),
+    ('earnings_model', 'equity_features'),
+    ('credit_model', 'equity_features'),
+    ('esg_model', 'equity_features'),
+    ('options_model', 'equity_features'),
+    ('macro_model', 'macro_features'),
+    ('macro_surprise_model', 'macro_features'),
+    ('betas_model', 'risk_features'),
+    ('residuals_model', 'risk_features'),
+)
+
+# Gold to Feast
+_DBT_GOLD_TO_FEAST = (
+    ('equity_features', 'feast_registry'),
+    ('macro_features', 'feast_registry'),
+    ('risk_features', 'feast_registry'),
+)
+
+# Feast internal flow
+_DBT_FEAST_INTERNAL = (
+    ('feast_registry', 'offline_store'),
+    ('offline_store', 'online_store'),
+)
+
+# Feast to Serving
+_DBT_FEAST_TO_SERVING = (
+    ('online_store', 'fastapi_serving'),
+    ('fastapi_serving', 'optimization_engine'),
+    ('fastapi_serving', 'risk_engine'),
+)
+
+_DBT_ALL = (
+    _DBT_SOURCE_TO_BRONZE + _DBT_BRONZE_TO_SILVER + _DBT_SILVER_TO_GOLD +
+    _DBT_GOLD_TO_FEAST + _DBT_FEAST_INTERNAL + _DBT_FEAST_TO_SERVING
+)
+
+# Special annotations: (src, dst, label)
+_DBT_ANNOTATIONS = (
+    ('macro_model', 'macro_surprise_model', 'regime context'),
+    ('value_model', 'earnings_model', 'fundamental correlation'),
+)
+
+# Feature lineage nodes: (node id, label, color key)
+_LINEAGE_NODES = (
     # Raw data
-    dot.node('daily_prices', 'Daily Prices\n(raw_daily_prices)', fillcolor=colors['raw'])
+    ('daily_prices', 'Daily Prices\n(raw_daily_prices)', 'raw'),
     
     # Calculations
-    dot.node('price_1m', '1-Month\nPrice Change', fillcolor=colors['calc'])
-    dot.node('price_3m', '3-Month\nPrice Change', fillcolor=colors['calc'])
-    dot.node('price_6m', '6-Month\nPrice Change', fillcolor=colors['calc'])
-    dot.node('price_12m', '12-Month\nPrice Change', fillcolor=colors['calc'])
-    dot.node('volatility', '60-Day\nVolatility', fillcolor=colors['calc'])
+    ('price_1m', '1-Month\nPrice Change', 'calc'),
+    ('price_3m', '3-Month\nPrice Change', 'calc'),
+    ('price_6m', '6-Month\nPrice Change', 'calc'),
+    ('price_12m', '12-Month\nPrice Change', 'calc'),
+    ('volatility', '60-Day\nVolatility', 'calc'),
     
     # Normalization
-    dot.node('mom_1m_z', '1M Momentum\nZ-Score', fillcolor=colors['normalize'])
-    dot.node('mom_3m_z', '3M Momentum\nZ-Score', fillcolor=colors['normalize'])
-    dot.node('mom_6m_z', '6M Momentum\nZ-Score', fillcolor=colors['normalize'])
-    dot.node('mom_12m_z', '12M Momentum\nZ-Score', fillcolor=colors['normalize'])
-    dot.node('risk_adj_mom', 'Risk-Adjusted\nMomentum', fillcolor=colors['normalize'])
+    ('mom_1m_z', '1M Momentum\nZ-Score', 'normalize'),
+    ('mom_3m_z', '3M Momentum\nZ-Score', 'normalize'),
+    ('mom_6m_z', '6M Momentum\nZ-Score', 'normalize'),
+    ('mom_12m_z', '12M Momentum\nZ-Score', 'normalize'),
+    ('risk_adj_mom', 'Risk-Adjusted\nMomentum', 'normalize'),
     
     # Composite
-    dot.node('momentum_score', 'Composite\nMomentum Score', fillcolor=colors['composite'])
+    ('momentum_score', 'Composite\nMomentum Score', 'composite'),
     
     # Output
-    dot.node('portfolio_tilt', 'Portfolio\nTilt Signal', fillcolor=colors['output'])
+    ('portfolio_tilt', 'Portfolio\nTilt Signal', 'output'),
+)
+
+# Feature lineage connections with calculations: (src, dst, label)
+_LINEAGE_CONNECTIONS = (
+    ('daily_prices', 'price_1m', 'LAG(price, 21)'),
+    ('daily_prices', 'price_3m', 'LAG(price, 63)'),
+    ('daily_prices', 'price_6m', 'LAG(price, 126)'),
+    ('daily_prices', 'price_12m', 'LAG(price, 252)'),
+    ('daily_prices', 'volatility', 'STDDEV(returns)'),
+    
+    ('price_1m', 'mom_1m_z', 'sector z-score'),
+    ('price_3m', 'mom_3m_z', 'sector z-score'),
+    ('price_6m', 'mom_6m_z', 'sector z-score'),
+    ('price_12m', 'mom_12m_z', 'sector z-score'),
+    ('price_3m', 'risk_adj_mom', 'momentum / volatility'),
+    ('volatility', 'risk_adj_mom', ''),
+    
+    ('mom_1m_z', 'momentum_score', 'weighted\naverage'),
+    ('mom_3m_z', 'momentum_score', ''),
+    ('mom_6m_z', 'momentum_score', ''),
+    ('mom_12m_z', 'momentum_score', ''),
+    ('risk_adj_mom', 'momentum_score', ''),
+    
+    ('momentum_score', 'portfolio_tilt', 'factor coefficient'),
+)
+
+
+# Diagram definitions are static, so build each one once per process.
+@lru_cache(maxsize=1)
+def create_dbt_featurestore_flow():
+    """Create comprehensive dbt to feature store flow diagram as DOT text"""
+    
+    # Emit the DOT text in one pass instead of one graphviz call per node/edge.
+    # layout=fdp rather than dot: this graph is dense across clusters and dot's
+    # ranked layout with spline routing dominates render time. fdp (unlike sfdp)
+    # still draws the cluster boxes.
+    lines = [
+        'digraph dbt_featurestore_flow {',
+        '\t// dbt to Feature Store Flow',
+        # Straight edges keep the force-directed layout cheap. rankdir/ranksep
+        # are dot-only, so spacing is set with fdp's K (ideal edge length) and
+        # sep (margin kept around nodes when removing overlaps)
+        '\tgraph [layout=fdp K=0.25 nodesep=0.2 overlap=prism sep="+4" size="16,12" splines=line]',
+        '\tnode [fontname=Arial fontsize=9 shape=box style="rounded,filled"]',
+        '\tedge [fontname=Arial fontsize=8]',
+    ]
     
-    # Define connections with calculations
-    connections = [
-        ('daily_prices', 'price_1m', 'LAG(price, 21)'),
-        ('daily_prices', 'price_3m', 'LAG(price, 63)'),
-        ('daily_prices', 'price_6m', 'LAG(price, 126)'),
-        ('daily_prices', 'price_12m', 'LAG(price, 252)'),
-        ('daily_prices', 'volatility', 'STDDEV(returns)'),
-        
-        ('price_1m', 'mom_1m_z', 'sector z-score'),
-        ('price_3m', 'mom_3m_z', 'sector z-score'),
-        ('price_6m', 'mom_6m_z', 'sector z-score'),
-        ('price_12m', 'mom_12m_z', 'sector z-score'),
-        ('price_3m', 'risk_adj_mom', 'momentum / volatility'),
-        ('volatility', 'risk_adj_mom', ''),
-        
-        ('mom_1m_z', 'momentum_score', 'weighted\naverage'),
-        ('mom_3m_z', 'momentum_score', ''),
-        ('mom_6m_z', 'momentum_score', ''),
-        ('mom_12m_z', 'momentum_score', ''),
-        ('risk_adj_mom', 'momentum_score', ''),
-        
-        ('momentum_score', 'portfolio_tilt', 'factor coefficient'),
+    for cluster, cluster_label, color_key in _DBT_CLUSTERS:
+        fillcolor = COLORS[color_key]
+        lines.append(f'\tsubgraph cluster_{cluster} {{')
+        lines.append(f'\t\tgraph [color=lightgray label={dot_quote(cluster_label)} style=filled]')
+        lines.extend(
+            f'\t\t{node_id} [label={dot_quote(label)} fillcolor="{fillcolor}"]'
+            for node_cluster, node_id, label in _DBT_NODES
+            if node_cluster == cluster
+        )
+        lines.append('\t}')
+    
+    # dict.fromkeys drops repeated (src, dst) pairs while keeping edge order
+    lines.extend(f'\t{src} -> {dst}' for src, dst in dict.fromkeys(_DBT_ALL))
+    lines.extend(
+        f'\t{src} -> {dst} [label={dot_quote(label)} fontsize=7 style=dashed]'
+        for src, dst, label in _DBT_ANNOTATIONS
+    )
+    lines.append('}')
+    
+    return '\n'.join(lines) + '\n'
+
+
+# Diagram definitions are static, so build each one once per process.
+@lru_cache(maxsize=1)
+def create_feature_lineage_diagram():
+    """Create a feature lineage diagram for a specific feature as DOT text"""
+    
+    lines = [
+        'digraph feature_lineage {',
+        '\t// Feature Lineage Example: Momentum Score',
+        # Straight edges skip spline routing, and concentrate merges the five
+        # parallel arrows into momentum_score
+        '\tgraph [concentrate=true nodesep=0.15 rankdir=LR ranksep=0.3 size="12,8" splines=line]',
+        '\tnode [fontname=Arial fontsize=10 shape=ellipse style=filled]',
+        '\tedge [fontname=Arial fontsize=9]',
     ]
+    lines.extend(
+        f'\t{node_id} [label={dot_quote(label)} fillcolor="{COLORS[color_key]}"]'
+        for node_id, label, color_key in _LINEAGE_NODES
+    )
     
     # Add edges with labels
-    for src, dst, label in connections:
-        if label:
-            dot.edge(src, dst, label=label, fontsize='8')
-        else:
-            dot.edge(src, dst)
+    lines.extend(
+        f'\t{src} -> {dst} [label={dot_quote(label)} fontsize=8]' if label else f'\t{src} -> {dst}'
+        for src, dst, label in _LINEAGE_CONNECTIONS
+    )
+    lines.append('}')
     
-    return dot
+    return '\n'.join(lines) + '\n'
 
 
 def main():
     """Generate and save dbt feature store flow diagrams"""
     
-    # Create output directory
+    parser = argparse.ArgumentParser(description="Generate dbt and Feature Store flow diagrams")
+    parser.add_argument(
+        "--png",
+        action="store_true",
+        help="Render PNG instead of the default SVG (for tools that need raster images)"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Print the DOT sources without rendering them"
+    )
+    args = parser.parse_args()
+    fmt = 'png' if args.png else 'svg'
+    
+    if args.dry_run:
+        print(create_dbt_featurestore_flow())
+        print(create_feature_lineage_diagram())
+        return
+    
+    # Create and validate the output directory before building any diagram
     output_dir = Path('docs/images')
-    output_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        output_dir.mkdir(parents=True, exist_ok=True)
+    except OSError as e:
+        print(f"❌ Cannot create output directory {output_dir}: {e}")
+        return
+    if not os.access(output_dir, os.W_OK):
+        print(f"❌ Output directory {output_dir} is not writable")
+        return
     
     print("Generating dbt and Feature Store flow diagrams...")
     
     try:
         # Generate main flow diagram
         flow_diagram = create_dbt_featurestore_flow()
-        flow_diagram.render(
-            str(output_dir / 'dbt_featurestore_flow'),
-            cleanup=True
-        )
-        print(f"✅ dbt Feature Store flow saved to {output_dir / 'dbt_featurestore_flow.png'}")
+        render_dot(flow_diagram, output_dir / 'dbt_featurestore_flow', fmt)
+        print(f"✅ dbt Feature Store flow saved to {output_dir / f'dbt_featurestore_flow.{fmt}'}")
         
         # Generate feature lineage diagram
         lineage_diagram = create_feature_lineage_diagram()
-        lineage_diagram.render(
-            str(output_dir / 'feature_lineage'),
-            cleanup=True
-        )
-        print(f"✅ Feature lineage diagram saved to {output_dir / 'feature_lineage.png'}")
+        render_dot(lineage_diagram, output_dir / 'feature_lineage', fmt)
+        print(f"✅ Feature lineage diagram saved to {output_dir / f'feature_lineage.{fmt}'}")
         
         print("\n📊 dbt and Feature Store diagrams generated successfully!")
         print("These diagrams show:")
@@ -285,8 +324,7 @@ def main():
         
     except Exception as e:
         print(f"❌ Error generating diagrams: {e}")
-        print("Make sure Graphviz is installed: pip install graphviz")
-        print("And system Graphviz: apt-get install graphviz (Ubuntu) or brew install graphviz (Mac)")
+        print("Make sure system Graphviz is installed: apt-get install graphviz (Ubuntu) or brew install graphviz (Mac)")
 
 
 if __name__ == "__main__":
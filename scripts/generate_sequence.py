@@ -6,207 +6,215 @@ This script creates sequence diagrams showing the flow of operations
 through the Financial Decision Engine system.
 """
 
-import os
+import argparse
+import hashlib
+from functools import lru_cache
 from pathlib import Path
 import graphviz
 
+from _graphviz_common import dot_quote, render_dot_batch
 
-def create_optimization_sequence():
-    """Create sequence diagram for portfolio optimization workflow"""
-    
-    dot = graphviz.Digraph(
-        'optimization_sequence',
-        comment='Portfolio Optimization Sequence',
-        format='png'
-    )
-    
-    dot.attr(rankdir='TB', size='12,10', dpi='300')
-    dot.attr('node', shape='box', style='rounded,filled', fontname='Arial', fontsize='10')
-    dot.attr('edge', fontname='Arial', fontsize='9')
-    
-    # Define actors/components
-    actors = [
-        ('client', 'Client\n(Streamlit/API)', '#FFE0B2'),
-        ('api', 'FastAPI\nService', '#E3F2FD'),
-        ('feast', 'Feast\nFeature Store', '#F3E5F5'),
-        ('optimizer', 'Portfolio\nOptimizer', '#E8F5E8'),
-        ('risk_mgmt', 'Risk\nManager', '#FFEB3B'),
-        ('mlflow', 'MLflow\nLogger', '#E0F2F1'),
-    ]
-    
-    # Create nodes
-    for actor_id, label, color in actors:
-        dot.node(actor_id, label, fillcolor=color)
-    
-    # Define sequence steps
-    steps = [
-        ('client', 'api', '1. POST /optimize\n{assets, returns, covariance}'),
-        ('api', 'feast', '2. get_features()\nretrieve factor exposures'),
-        ('feast', 'api', '3. return features'),
-        ('api', 'optimizer', '4. mean_variance_optimize()\nmu, sigma, constraints'),
-        ('optimizer', 'optimizer', '5. solve CVXPY\noptimization problem'),
-        ('optimizer', 'api', '6. return optimal weights'),
-        ('api', 'risk_mgmt', '7. check_concentration()\nHHI analysis'),
-        ('risk_mgmt', 'risk_mgmt', '8. repair_concentration()\nif violations found'),
-        ('risk_mgmt', 'api', '9. return final weights'),
-        ('api', 'mlflow', '10. log_optimization_run()\nmetrics & portfolio'),
-        ('mlflow', 'api', '11. return run_id'),
-        ('api', 'client', '12. return portfolio\nwith metrics'),
+
+# Diagram data is static, so it is built once at import time
+
+# Portfolio optimization workflow actors
+_OPTIMIZATION_ACTORS = (
+    ('client', 'Client\n(Streamlit/API)', '#FFE0B2'),
+    ('api', 'FastAPI\nService', '#E3F2FD'),
+    ('feast', 'Feast\nFeature Store', '#F3E5F5'),
+    ('optimizer', 'Portfolio\nOptimizer\n[solves CVXPY problem]', '#E8F5E8'),
+    ('risk_mgmt', 'Risk\nManager\n[repairs concentration\nif violations found]', '#FFEB3B'),
+    ('mlflow', 'MLflow\nLogger', '#E0F2F1'),
+)
+
+# Portfolio optimization workflow steps
+_OPTIMIZATION_STEPS = (
+    ('client', 'api', '1. POST /optimize\n{assets, returns, covariance}'),
+    ('api', 'feast', '2. get_features()\nretrieve factor exposures'),
+    ('feast', 'api', '3. return features'),
+    ('api', 'optimizer', '4. mean_variance_optimize()\nmu, sigma, constraints'),
+    ('optimizer', 'api', '5. return optimal weights'),
+    ('api', 'risk_mgmt', '6. check_concentration()\nHHI analysis'),
+    ('risk_mgmt', 'api', '7. return final weights'),
+    ('api', 'mlflow', '8. log_optimization_run()\nmetrics & portfolio'),
+    ('mlflow', 'api', '9. return run_id'),
+    ('api', 'client', '10. return portfolio\nwith metrics'),
+)
+
+# RAG query workflow actors
+_RAG_ACTORS = (
+    ('user', 'User', '#FFCDD2'),
+    ('streamlit', 'Streamlit\nRAG Page', '#F8BBD9'),
+    ('rag_system', 'RAG\nSystem\n[synthesizes response]', '#E1BEE7'),
+    ('postgres', 'PostgreSQL\n+ pgvector', '#C5CAE9'),
+    ('embeddings', 'Embedding\nModel', '#BBDEFB'),
+)
+
+# RAG query workflow steps
+_RAG_STEPS = (
+    ('user', 'streamlit', '1. Enter financial\nquestion'),
+    ('streamlit', 'rag_system', '2. query(question)'),
+    ('rag_system', 'embeddings', '3. generate_embedding()\nquestion vector'),
+    ('embeddings', 'rag_system', '4. return embedding'),
+    ('rag_system', 'postgres', '5. similarity_search()\nvector <=> embedding'),
+    ('postgres', 'rag_system', '6. return relevant\ndocuments'),
+    ('rag_system', 'streamlit', '7. return response\n+ source docs'),
+    ('streamlit', 'user', '8. display answer\nwith sources'),
+)
+
+# Feature engineering pipeline actors
+_PIPELINE_ACTORS = (
+    ('scheduler', 'Scheduler\n(Airflow/Cron)', '#FFAB91'),
+    ('dbt', 'dbt Core', '#FFE0B2'),
+    ('bigquery', 'BigQuery\nData Warehouse', '#FFF9C4'),
+    ('feature_store', 'Feast\nFeature Store', '#DCEDC8'),
+    ('postgres', 'PostgreSQL\nOnline Store', '#BBDEFB'),
+    ('api', 'FastAPI\nService\n[updates feature\ncache/metadata]', '#E1BEE7'),
+)
+
+# Feature engineering pipeline steps
+_PIPELINE_STEPS = (
+    ('scheduler', 'dbt', '1. trigger daily\nfeature refresh'),
+    ('dbt', 'bigquery', '2. execute SQL models\nmomentum, value, etc.'),
+    ('bigquery', 'dbt', '3. return computed\nfeatures'),
+    ('dbt', 'feature_store', '4. materialize features\nto Feast offline store'),
+    ('feature_store', 'postgres', '5. sync to online store\nfor real-time serving'),
+    ('postgres', 'feature_store', '6. confirm sync'),
+    ('feature_store', 'api', '7. notify feature\navailability'),
+)
+
+# Risk management workflow actors
+_RISK_ACTORS = (
+    ('portfolio', 'Portfolio\nInput', '#FFCDD2'),
+    ('risk_analyzer', 'Risk\nAnalyzer', '#F8BBD9'),
+    ('policy_engine', 'Policy\nEngine', '#E1BEE7'),
+    ('optimizer', 'Concentration\nRepair\n[solves CVXPY]', '#C5CAE9'),
+    ('validator', 'Risk\nValidator', '#BBDEFB'),
+)
+
+# Risk management workflow steps
+_RISK_STEPS = (
+    ('portfolio', 'risk_analyzer', '1. analyze(weights)\ncalculate HHI, exposures'),
+    ('risk_analyzer', 'policy_engine', '2. check_policies()\nconcentration limits'),
+    ('policy_engine', 'risk_analyzer', '3. return violations\nif any found'),
+    ('risk_analyzer', 'optimizer', '4. repair_concentration()\nif violations exist'),
+    ('optimizer', 'risk_analyzer', '5. return repaired\nweights'),
+    ('risk_analyzer', 'validator', '6. validate_final()\ncheck all constraints'),
+    ('validator', 'portfolio', '7. return final\nportfolio + metrics'),
+)
+
+
+@lru_cache(maxsize=1)
+def _graphviz_version():
+    """Installed Graphviz version, looked up once per run"""
+    return '.'.join(map(str, graphviz.version()))
+
+
+def _render_digest(source, fmt):
+    """
+    Cache key for a rendered diagram
+    
+    SHA-256 of the DOT source, the output format and the installed Graphviz
+    version, so a Graphviz upgrade also invalidates cached renders.
+    """
+    key = f"{source}\0{fmt}\0{_graphviz_version()}"
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _is_cached(out_path, fmt, digest):
+    """Whether out_path.<fmt> exists and its .hash sidecar matches digest"""
+    rendered = out_path.with_name(f"{out_path.name}.{fmt}")
+    hash_file = out_path.with_name(f"{out_path.name}.hash")
+    return rendered.exists() and hash_file.exists() and hash_file.read_text().strip() == digest
+
+
+def _sequence_diagram(name, comment, size, actors, steps):
+    """
+    Build a sequence diagram as one DOT source instead of per-call Digraph edits
+    
+    Args:
+        name: Graph name
+        comment: Comment written at the top of the DOT source
+        size: Maximum drawing size in inches
+        actors: (actor id, label, fill color) tuples
+        steps: (src, dst, label) tuples, in sequence order
+        
+    Returns:
+        graphviz.Source rendering to SVG
+    """
+    lines = [
+        f'// {comment}',
+        f'digraph {name} {{',
+        f'\tgraph [concentrate=true nodesep=0.3 rankdir=TB ranksep=0.4 size="{size}" splines=line]',
+        '\tnode [fontname=Arial fontsize=10 shape=box style="rounded,filled"]',
+        '\tedge [fontname=Arial fontsize=8]',
     ]
-    
-    # Create a vertical layout showing the sequence
-    with dot.subgraph() as s:
-        s.attr(rank='same')
-        for actor_id, _, _ in actors:
-            s.node(f"{actor_id}_line", '', shape='point', width='0')
+    lines.extend(f'\t{actor_id} [label={dot_quote(label)} fillcolor="{color}"]' for actor_id, label, color in actors)
     
     # Add sequence arrows
-    for i, (src, dst, label) in enumerate(steps):
-        dot.edge(src, dst, label=f"{label}", fontsize='8')
+    lines.extend(f'\t{src} -> {dst} [label={dot_quote(label)}]' for src, dst, label in steps)
+    lines.append('}')
+    
+    return graphviz.Source('\n'.join(lines) + '\n', format='svg')
+
+
+def create_optimization_sequence():
+    """Create sequence diagram for portfolio optimization workflow"""
     
-    return dot
+    return _sequence_diagram(
+        'optimization_sequence', 'Portfolio Optimization Sequence', '12,10',
+        _OPTIMIZATION_ACTORS, _OPTIMIZATION_STEPS
+    )
 
 
 def create_rag_sequence():
     """Create sequence diagram for RAG query workflow"""
     
-    dot = graphviz.Digraph(
-        'rag_sequence',
-        comment='RAG Query Sequence',
-        format='png'
+    return _sequence_diagram(
+        'rag_sequence', 'RAG Query Sequence', '10,8',
+        _RAG_ACTORS, _RAG_STEPS
     )
-    
-    dot.attr(rankdir='TB', size='10,8', dpi='300')
-    dot.attr('node', shape='box', style='rounded,filled', fontname='Arial', fontsize='10')
-    dot.attr('edge', fontname='Arial', fontsize='9')
-    
-    # Define actors
-    actors = [
-        ('user', 'User', '#FFCDD2'),
-        ('streamlit', 'Streamlit\nRAG Page', '#F8BBD9'),
-        ('rag_system', 'RAG\nSystem', '#E1BEE7'),
-        ('postgres', 'PostgreSQL\n+ pgvector', '#C5CAE9'),
-        ('embeddings', 'Embedding\nModel', '#BBDEFB'),
-    ]
-    
-    # Create nodes
-    for actor_id, label, color in actors:
-        dot.node(actor_id, label, fillcolor=color)
-    
-    # Define sequence
-    steps = [
-        ('user', 'streamlit', '1. Enter financial\nquestion'),
-        ('streamlit', 'rag_system', '2. query(question)'),
-        ('rag_system', 'embeddings', '3. generate_embedding()\nquestion vector'),
-        ('embeddings', 'rag_system', '4. return embedding'),
-        ('rag_system', 'postgres', '5. similarity_search()\nvector <=> embedding'),
-        ('postgres', 'rag_system', '6. return relevant\ndocuments'),
-        ('rag_system', 'rag_system', '7. generate_response()\nRAG synthesis'),
-        ('rag_system', 'streamlit', '8. return response\n+ source docs'),
-        ('streamlit', 'user', '9. display answer\nwith sources'),
-    ]
-    
-    # Add sequence arrows
-    for src, dst, label in steps:
-        dot.edge(src, dst, label=label, fontsize='8')
-    
-    return dot
 
 
 def create_feature_pipeline_sequence():
     """Create sequence diagram for feature engineering pipeline"""
     
-    dot = graphviz.Digraph(
-        'feature_pipeline_sequence',
-        comment='Feature Engineering Pipeline',
-        format='png'
+    return _sequence_diagram(
+        'feature_pipeline_sequence', 'Feature Engineering Pipeline', '12,10',
+        _PIPELINE_ACTORS, _PIPELINE_STEPS
     )
-    
-    dot.attr(rankdir='TB', size='12,10', dpi='300')
-    dot.attr('node', shape='box', style='rounded,filled', fontname='Arial', fontsize='10')
-    dot.attr('edge', fontname='Arial', fontsize='9')
-    
-    # Define components
-    actors = [
-        ('scheduler', 'Scheduler\n(Airflow/Cron)', '#FFAB91'),
-        ('dbt', 'dbt Core', '#FFE0B2'),
-        ('bigquery', 'BigQuery\nData Warehouse', '#FFF9C4'),
-        ('feature_store', 'Feast\nFeature Store', '#DCEDC8'),
-        ('postgres', 'PostgreSQL\nOnline Store', '#BBDEFB'),
-        ('api', 'FastAPI\nService', '#E1BEE7'),
-    ]
-    
-    # Create nodes
-    for actor_id, label, color in actors:
-        dot.node(actor_id, label, fillcolor=color)
-    
-    # Define pipeline steps
-    steps = [
-        ('scheduler', 'dbt', '1. trigger daily\nfeature refresh'),
-        ('dbt', 'bigquery', '2. execute SQL models\nmomentum, value, etc.'),
-        ('bigquery', 'dbt', '3. return computed\nfeatures'),
-        ('dbt', 'feature_store', '4. materialize features\nto Feast offline store'),
-        ('feature_store', 'postgres', '5. sync to online store\nfor real-time serving'),
-        ('postgres', 'feature_store', '6. confirm sync'),
-        ('feature_store', 'api', '7. notify feature\navailability'),
-        ('api', 'api', '8. update feature\ncache/metadata'),
-    ]
-    
-    # Add sequence arrows
-    for src, dst, label in steps:
-        dot.edge(src, dst, label=label, fontsize='8')
-    
-    return dot
 
 
 def create_risk_management_sequence():
     """Create sequence diagram for risk management workflow"""
     
-    dot = graphviz.Digraph(
-        'risk_management_sequence',
-        comment='Risk Management Sequence',
-        format='png'
+    return _sequence_diagram(
+        'risk_management_sequence', 'Risk Management Sequence', '10,8',
+        _RISK_ACTORS, _RISK_STEPS
     )
-    
-    dot.attr(rankdir='TB', size='10,8', dpi='300')
-    dot.attr('node', shape='box', style='rounded,filled', fontname='Arial', fontsize='10')
-    dot.attr('edge', fontname='Arial', fontsize='9')
-    
-    # Define components
-    actors = [
-        ('portfolio', 'Portfolio\nInput', '#FFCDD2'),
-        ('risk_analyzer', 'Risk\nAnalyzer', '#F8BBD9'),
-        ('policy_engine', 'Policy\nEngine', '#E1BEE7'),
-        ('optimizer', 'Concentration\nRepair', '#C5CAE9'),
-        ('validator', 'Risk\nValidator', '#BBDEFB'),
-    ]
-    
-    # Create nodes
-    for actor_id, label, color in actors:
-        dot.node(actor_id, label, fillcolor=color)
-    
-    # Define sequence
-    steps = [
-        ('portfolio', 'risk_analyzer', '1. analyze(weights)\ncalculate HHI, exposures'),
-        ('risk_analyzer', 'policy_engine', '2. check_policies()\nconcentration limits'),
-        ('policy_engine', 'risk_analyzer', '3. return violations\nif any found'),
-        ('risk_analyzer', 'optimizer', '4. repair_concentration()\nif violations exist'),
-        ('optimizer', 'optimizer', '5. solve CVXPY\noptimization'),
-        ('optimizer', 'risk_analyzer', '6. return repaired\nweights'),
-        ('risk_analyzer', 'validator', '7. validate_final()\ncheck all constraints'),
-        ('validator', 'portfolio', '8. return final\nportfolio + metrics'),
-    ]
-    
-    # Add sequence arrows
-    for src, dst, label in steps:
-        dot.edge(src, dst, label=label, fontsize='8')
-    
-    return dot
+
+
+# (output name, factory, description)
+SEQUENCES = [
+    ('sequence_optimization', create_optimization_sequence, 'Optimization sequence'),
+    ('sequence_rag', create_rag_sequence, 'RAG sequence'),
+    ('sequence_feature_pipeline', create_feature_pipeline_sequence, 'Feature pipeline sequence'),
+    ('sequence_risk_management', create_risk_management_sequence, 'Risk management sequence'),
+]
 
 
 def main():
     """Generate and save sequence diagrams"""
     
+    parser = argparse.ArgumentParser(description="Generate sequence diagrams")
+    parser.add_argument(
+        "--png",
+        action="store_true",
+        help="Render PNG instead of the default SVG (for tools that need raster images)"
+    )
+    args = parser.parse_args()
+    fmt = 'png' if args.png else 'svg'
+    
     # Create output directory
     output_dir = Path('docs/images')
     output_dir.mkdir(parents=True, exist_ok=True)
@@ -214,37 +222,25 @@ def main():
     print("Generating Financial Decision Engine sequence diagrams...")
     
     try:
-        # Generate optimization sequence
-        opt_diagram = create_optimization_sequence()
-        opt_diagram.render(
-            str(output_dir / 'sequence_optimization'),
-            cleanup=True
-        )
-        print(f"✅ Optimization sequence saved to {output_dir / 'sequence_optimization.png'}")
-        
-        # Generate RAG sequence
-        rag_diagram = create_rag_sequence()
-        rag_diagram.render(
-            str(output_dir / 'sequence_rag'),
-            cleanup=True
-        )
-        print(f"✅ RAG sequence saved to {output_dir / 'sequence_rag.png'}")
+        # Only diagrams whose source, format or Graphviz version changed are rendered
+        stale = {}
+        digests = {}
+        for name, factory, description in SEQUENCES:
+            source = factory().source
+            digests[name] = _render_digest(source, fmt)
+            if _is_cached(output_dir / name, fmt, digests[name]):
+                print(f"⏭️  {description} unchanged, skipped {output_dir / f'{name}.{fmt}'}")
+            else:
+                stale[name] = source
         
-        # Generate feature pipeline sequence
-        pipeline_diagram = create_feature_pipeline_sequence()
-        pipeline_diagram.render(
-            str(output_dir / 'sequence_feature_pipeline'),
-            cleanup=True
-        )
-        print(f"✅ Feature pipeline sequence saved to {output_dir / 'sequence_feature_pipeline.png'}")
+        # One Graphviz process for every stale diagram instead of one per diagram
+        if stale:
+            render_dot_batch(stale, output_dir, fmt)
         
-        # Generate risk management sequence
-        risk_diagram = create_risk_management_sequence()
-        risk_diagram.render(
-            str(output_dir / 'sequence_risk_management'),
-            cleanup=True
-        )
-        print(f"✅ Risk management sequence saved to {output_dir / 'sequence_risk_management.png'}")
+        for name, _, description in SEQUENCES:
+            if name in stale:
+                (output_dir / f"{name}.hash").write_text(digests[name])
+                print(f"✅ {description} saved to {output_dir / f'{name}.{fmt}'}")
         
         print("\n📊 Sequence diagrams generated successfully!")
         print("These diagrams show the workflow for:")
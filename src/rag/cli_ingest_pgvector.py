@@ -4,29 +4,53 @@ CLI tool for ingesting documents into the PGVector RAG system.
 
 This script allows batch ingestion of financial documents from various sources
 into the vector database for retrieval-augmented generation.
+
+Usage:
+    python -m src.rag.cli_ingest_pgvector --sample
 """
 
 import argparse
-import json
+import hashlib
+import io
 import logging
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, Iterator, List, Sequence, Tuple
 import sys
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+import ijson
+import orjson
 
-try:
+if __package__:
     from .rag_pgvector import PGVectorRAG
-except ImportError:
-    # For direct execution
-    sys.path.append(str(Path(__file__).parent.parent.parent))
+else:
+    # Direct execution; prefer `python -m src.rag.cli_ingest_pgvector`
+    _repo_root = str(Path(__file__).resolve().parents[2])
+    if _repo_root not in sys.path:
+        sys.path.insert(0, _repo_root)
     from src.rag.rag_pgvector import PGVectorRAG
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Documents parsed, embedded and inserted per batch when ingesting from a file
+INGEST_BATCH_SIZE = 64
+
+# Batches embedded and inserted concurrently; also bounds how many parsed
+# batches are held in memory at once
+INGEST_WORKERS = 4
 
-def load_sample_documents() -> List[Dict[str, Any]]:
-    """Load sample financial documents for testing"""
-    return [
+
+@lru_cache(maxsize=1)
+def load_sample_documents() -> Tuple[Dict[str, Any], ...]:
+    """
+    Load sample financial documents for testing
+    
+    The result is cached and shared between callers, so treat it as read-only.
+    """
+    return (
         {
             "content": """
             Modern Portfolio Theory (MPT) Fundamentals:
@@ -187,54 +211,154 @@ def load_sample_documents() -> List[Dict[str, Any]]:
                 "source": "technical"
             }
         }
-    ]
+    )
+
+
+def _chunked(iterable: Iterable[Any], n: int) -> Iterator[List[Any]]:
+    """Yield successive lists of at most n items from an iterable"""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, n)):
+        yield batch
 
 
-def ingest_documents(rag: PGVectorRAG, documents: List[Dict[str, Any]]) -> None:
+def _iter_json_documents(f: io.BufferedReader) -> Iterator[Dict[str, Any]]:
+    """
+    Stream documents from a JSON file opened in buffered binary mode
+    
+    A top-level array is parsed incrementally with ijson so the whole file
+    never has to fit in memory; a single top-level object is one document.
+    """
+    # Peek at the buffered head to tell an object from an array without
+    # consuming input, so non-seekable streams work too
+    if f.peek().lstrip()[:1] == b"{":
+        yield orjson.loads(f.read())
+    else:
+        # use_float keeps numbers as float rather than Decimal, which orjson
+        # cannot serialise when the metadata is stored
+        yield from ijson.items(f, "item", use_float=True)
+
+
+def ingest_documents(rag: PGVectorRAG, documents: Sequence[Dict[str, Any]]) -> int:
     """
     Ingest a list of documents into the RAG system
     
+    Document IDs are derived from a hash of the content, so documents that are
+    already stored are skipped without being embedded again. Malformed
+    documents are logged and skipped; the rest are still ingested.
+    
     Args:
         rag: PGVectorRAG instance
-        documents: List of document dictionaries with 'content' and 'metadata'
+        documents: Document dictionaries with 'content' and 'metadata'
+    
+    Returns:
+        Number of documents that failed to ingest: the malformed ones, plus
+        every valid one if the batch insert fails
     """
-    logger.info(f"Starting ingestion of {len(documents)} documents...")
+    logger.info("Starting ingestion of %d documents...", len(documents))
     
+    # Single pass over the batch with the per-document lookups bound to locals
+    contents, metadatas, doc_ids = [], [], []
+    add_content, add_metadata, add_id = contents.append, metadatas.append, doc_ids.append
+    sha256 = hashlib.sha256
+    invalid = 0
     for i, doc in enumerate(documents):
         try:
-            doc_id = f"sample_doc_{i:03d}"
-            rag.add_document(
-                content=doc["content"],
-                metadata=doc["metadata"],
-                doc_id=doc_id
-            )
-            logger.info(f"Ingested document {doc_id}: {doc['metadata'].get('title', 'Untitled')}")
-            
-        except Exception as e:
-            logger.error(f"Failed to ingest document {i}: {e}")
+            content = doc["content"]
+            metadata = doc["metadata"]
+            if not isinstance(content, str) or not isinstance(metadata, dict):
+                raise TypeError("'content' must be a string and 'metadata' an object")
+        except (KeyError, TypeError) as e:
+            logger.error("Skipping malformed document %d: %s", i, e)
+            invalid += 1
+            continue
+        add_content(content)
+        add_metadata(metadata)
+        add_id(sha256(content.encode()).hexdigest()[:16])
+    
+    if not contents:
+        return invalid
+    
+    # One transaction for the whole batch instead of one round-trip per document
+    try:
+        written = set(rag.add_documents(contents, metadatas, doc_ids, skip_existing=True))
+    except Exception as e:
+        logger.error("Failed to ingest %d documents: %s", len(contents), e)
+        return invalid + len(contents)
+    
+    if logger.isEnabledFor(logging.INFO):
+        log_info = logger.info
+        for doc_id, metadata in zip(doc_ids, metadatas):
+            if doc_id in written:
+                log_info("Ingested document %s: %s", doc_id, metadata.get('title', 'Untitled'))
+            else:
+                log_info("Skipped unchanged document %s: %s", doc_id, metadata.get('title', 'Untitled'))
     
     logger.info("Document ingestion completed!")
+    return invalid
+
+
+def _collect_failures(pending: Dict[Future, int], futures: Iterable[Future]) -> int:
+    """
+    Wait for finished ingestion batches and count their failed documents
+    
+    A batch whose future raised counts as failed in full. Collected futures
+    are removed from pending.
+    
+    Args:
+        pending: Submitted futures mapped to their batch sizes
+        futures: Futures from pending to collect
+        
+    Returns:
+        Number of documents that failed to ingest
+    """
+    failed = 0
+    for future in futures:
+        batch_size = pending.pop(future)
+        try:
+            failed += future.result()
+        except Exception as e:
+            logger.error("Failed to ingest batch of %d documents: %s", batch_size, e)
+            failed += batch_size
+    return failed
 
 
-def ingest_from_file(rag: PGVectorRAG, file_path: Path) -> None:
+def ingest_from_file(rag: PGVectorRAG, file_path: Path) -> int:
     """
     Ingest documents from a JSON file
     
+    Batches are handed to a thread pool so parsing the next batch overlaps
+    with embedding and inserting the previous ones. Each batch uses its own
+    database connection.
+    
     Args:
         rag: PGVectorRAG instance
         file_path: Path to JSON file containing documents
+    
+    Returns:
+        Number of documents that failed to ingest. If reading or parsing the
+        file fails part-way, the batches already submitted are still
+        collected and the unread remainder counts as one further failure.
     """
+    failed = 0
+    pending: Dict[Future, int] = {}
     try:
-        with open(file_path, 'r') as f:
-            documents = json.load(f)
-        
-        if not isinstance(documents, list):
-            documents = [documents]
-        
-        ingest_documents(rag, documents)
+        with open(file_path, 'rb') as f, ThreadPoolExecutor(max_workers=INGEST_WORKERS) as executor:
+            try:
+                for batch in _chunked(_iter_json_documents(f), INGEST_BATCH_SIZE):
+                    if len(pending) >= INGEST_WORKERS:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        failed += _collect_failures(pending, done)
+                    pending[executor.submit(ingest_documents, rag, batch)] = len(batch)
+            finally:
+                failed += _collect_failures(pending, list(pending))
         
     except Exception as e:
-        logger.error(f"Failed to ingest from file {file_path}: {e}")
+        logger.error("Failed to ingest from file %s: %s", file_path, e)
+        failed += 1
+    
+    if failed:
+        logger.error("%d documents from %s failed to ingest", failed, file_path)
+    return failed
 
 
 def main():
@@ -272,26 +396,28 @@ def main():
     if not args.sample and not args.file:
         parser.error("Must specify either --sample or --file")
     
+    rag = None
     try:
         # Initialize RAG system
         logger.info("Initializing PGVector RAG system...")
         rag = PGVectorRAG(connection_string=args.connection_string)
         
         # Ingest documents
+        failed = 0
         if args.sample:
             documents = load_sample_documents()
-            ingest_documents(rag, documents)
+            failed += ingest_documents(rag, documents)
         
         if args.file:
             file_path = Path(args.file)
             if not file_path.exists():
-                logger.error(f"File not found: {file_path}")
+                logger.error("File not found: %s", file_path)
                 return
-            ingest_from_file(rag, file_path)
+            failed += ingest_from_file(rag, file_path)
         
         # Test query
         if args.test_query:
-            logger.info(f"Testing query: {args.test_query}")
+            logger.info("Testing query: %s", args.test_query)
             result = rag.query(args.test_query)
             print(f"\nQuery: {result['query']}")
             print(f"Response: {result['response']}")
@@ -299,11 +425,17 @@ def main():
         
         # Print stats
         stats = rag.get_stats()
-        logger.info(f"RAG system stats: {stats}")
+        logger.info("RAG system stats: %s", stats)
+        
+        if failed:
+            return 1
         
     except Exception as e:
-        logger.error(f"Ingestion failed: {e}")
+        logger.error("Ingestion failed: %s", e)
         return 1
+    finally:
+        if rag is not None:
+            rag.close()
     
     return 0
 
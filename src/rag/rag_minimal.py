@@ -7,20 +7,137 @@ For production use, consider PGVectorRAG with proper vector database.
 
 import json
 import logging
+from functools import lru_cache
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 import re
+import textwrap
 
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
 
 logger = logging.getLogger(__name__)
 
+# Sample corpus for add_financial_documents; dedented and stripped once at
+# import so the stored text carries no source indentation
+_SAMPLE_DOCS = (
+    {
+        "content": textwrap.dedent("""
+        Portfolio Risk Management Best Practices:
+        1. Diversification across asset classes, sectors, and geographies
+        2. Regular rebalancing to maintain target allocations
+        3. Stress testing against historical scenarios
+        4. Monitoring concentration limits and exposure constraints
+        5. Using derivatives for hedging when appropriate
+        """).strip(),
+        "metadata": {"type": "risk_management", "category": "best_practices"}
+    },
+    {
+        "content": textwrap.dedent("""
+        Mean-Variance Optimization Theory:
+        Modern Portfolio Theory suggests that investors can construct portfolios
+        to maximize expected return for a given level of risk. The efficient frontier
+        represents the set of optimal portfolios offering the highest expected return
+        for each level of risk. Key assumptions include rational investors, normal
+        return distributions, and known correlations.
+        """).strip(),
+        "metadata": {"type": "theory", "category": "optimization"}
+    },
+    {
+        "content": textwrap.dedent("""
+        ESG Integration in Portfolio Construction:
+        Environmental, Social, and Governance factors can be integrated through:
+        - Exclusionary screening of controversial sectors
+        - Best-in-class selection within sectors
+        - Thematic investing in sustainable solutions
+        - ESG tilt overlays on existing strategies
+        - Impact measurement and reporting
+        """).strip(),
+        "metadata": {"type": "esg", "category": "integration"}
+    },
+    {
+        "content": textwrap.dedent("""
+        Factor Investing Fundamentals:
+        Academic research has identified several factors that explain returns:
+        - Value: Cheap stocks outperform expensive ones
+        - Momentum: Trending stocks continue to trend
+        - Quality: Profitable, stable companies outperform
+        - Size: Small-cap stocks have higher expected returns
+        - Low Volatility: Lower risk stocks often outperform
+        """).strip(),
+        "metadata": {"type": "factors", "category": "research"}
+    },
+    {
+        "content": textwrap.dedent("""
+        Concentration Risk and HHI Analysis:
+        The Herfindahl-Hirschman Index (HHI) measures portfolio concentration.
+        HHI = sum of squared weights. Values range from 1/N to 1.
+        - HHI > 0.15: Highly concentrated
+        - HHI 0.05-0.15: Moderately concentrated  
+        - HHI < 0.05: Well diversified
+        Concentration repair uses optimization to reduce HHI while minimizing changes.
+        """).strip(),
+        "metadata": {"type": "risk_metrics", "category": "concentration"}
+    }
+)
+
+
+# Documents scoring at or below this similarity are never returned
+_MIN_RELEVANCE = 0.01
+
+# Corpus size above which retrieve uses the compiled top-k scan, so the
+# one-off JIT compilation is amortized over large scans
+_COMPILED_TOPK_MIN_DOCS = 1000
+
+
+def _topk_above(similarities: np.ndarray, k: int, threshold: float) -> np.ndarray:
+    """
+    Indices of the k highest similarities above threshold, best first
+    
+    Single pass keeping a sorted buffer of k candidates, with no Python
+    object allocation inside the loop so it can be compiled with Numba.
+    
+    Args:
+        similarities: Similarity of every document to the query
+        k: Maximum number of indices to return
+        threshold: Similarities at or below this value are skipped
+        
+    Returns:
+        Document indices ordered by decreasing similarity
+    """
+    top_idx = np.empty(k, dtype=np.int64)
+    top_val = np.empty(k, dtype=similarities.dtype)
+    n = 0
+    for i in range(similarities.shape[0]):
+        value = similarities[i]
+        if value <= threshold or (n == k and value <= top_val[k - 1]):
+            continue
+        
+        # Insertion step: shift smaller candidates down, dropping the last when full
+        if n < k:
+            n += 1
+        j = n - 1
+        while j > 0 and top_val[j - 1] < value:
+            top_val[j] = top_val[j - 1]
+            top_idx[j] = top_idx[j - 1]
+            j -= 1
+        top_val[j] = value
+        top_idx[j] = i
+    
+    return top_idx[:n]
+
+
+try:
+    from numba import njit
+    _topk_above_compiled = njit(cache=True)(_topk_above)
+except ImportError:  # Numba is optional; retrieve falls back to numpy
+    _topk_above_compiled = None
+
 
 class SimpleRAG:
     """
-    Simple in-memory RAG implementation using TF-IDF for document retrieval.
+    Simple in-memory RAG implementation using hashed term vectors for document retrieval.
     
     This is a minimal implementation suitable for development and small-scale use.
     For production, use PGVectorRAG with proper vector embeddings.
@@ -35,13 +152,25 @@ class SimpleRAG:
         """
         self.max_docs = max_docs
         self.documents: List[Dict[str, Any]] = []
-        self.vectorizer = TfidfVectorizer(
-            max_features=1000,
+        # Stateless vectorizer: each document is vectorized once when added,
+        # so the corpus never has to be re-fitted
+        self.vectorizer = HashingVectorizer(
+            n_features=2 ** 18,
+            alternate_sign=False,
             stop_words='english',
-            ngram_range=(1, 2)
+            ngram_range=(1, 2),
+            norm='l2',
+            dtype=np.float32  # Half the bytes per stored weight; ranking needs no float64
         )
-        self.doc_vectors = None
-        self._is_fitted = False
+        # One L2-normalized CSR row per document, in self.documents order
+        self.doc_vectors: Optional[sparse.csr_matrix] = None
+        # Features x documents CSR copy of doc_vectors for batched scoring,
+        # rebuilt lazily after the corpus changes
+        self._doc_vectors_T: Optional[sparse.csr_matrix] = None
+        self._layout_dirty = True
+        # Repeated queries skip tokenization. The vectorizer is never refitted,
+        # so cached query vectors cannot go stale.
+        self._embed_query = lru_cache(maxsize=1024)(self._embed_query)
         
     def add_document(self, content: str, metadata: Optional[Dict[str, Any]] = None) -> str:
         """
@@ -54,106 +183,70 @@ class SimpleRAG:
         Returns:
             Document ID
         """
-        if metadata is None:
-            metadata = {}
+        return self.add_documents([{"content": content, "metadata": metadata}])[0]
+    
+    def add_documents(self, docs: List[Dict[str, Any]]) -> List[str]:
+        """
+        Add several documents at once
+        
+        All documents are vectorized in one transform call and appended to the
+        document matrix with a single vstack.
+        
+        Args:
+            docs: Document dictionaries with 'content' and optional 'metadata'
             
-        doc_id = f"doc_{len(self.documents)}_{datetime.now().timestamp()}"
-        
-        doc = {
-            "id": doc_id,
-            "content": content,
-            "metadata": metadata,
-            "timestamp": datetime.now().isoformat(),
-            "content_length": len(content)
-        }
+        Returns:
+            Document IDs, in input order
+        """
+        if not docs:
+            return []
+        
+        start = len(self.documents)
+        # One clock read per batch instead of two per document
+        now = datetime.now()
+        ts = now.timestamp()
+        iso = now.isoformat()
+        new_docs = []
+        for offset, item in enumerate(docs):
+            content = item["content"]
+            metadata = item.get("metadata")
+            if metadata is None:
+                metadata = {}
+            
+            new_docs.append({
+                "id": f"doc_{start + offset}_{ts}",
+                "content": content,
+                "metadata": metadata,
+                "timestamp": iso,
+                "content_length": len(content)
+            })
         
-        self.documents.append(doc)
+        self.documents.extend(new_docs)
+        
+        # Append the new rows; only the new documents are tokenized
+        new_vectors = self.vectorizer.transform([doc["content"] for doc in new_docs])
+        if self.doc_vectors is None:
+            self.doc_vectors = new_vectors.tocsr()
+        else:
+            self.doc_vectors = sparse.vstack([self.doc_vectors, new_vectors], format='csr')
         
         # Limit document storage
         if len(self.documents) > self.max_docs:
             self.documents = self.documents[-self.max_docs:]
-            
-        # Re-fit vectorizer when documents change
-        self._is_fitted = False
+            self.doc_vectors = self.doc_vectors[-self.max_docs:]
+        
+        self._layout_dirty = True
         
-        logger.info(f"Added document {doc_id}, total documents: {len(self.documents)}")
-        return doc_id
+        logger.info(f"Added {len(new_docs)} documents, total documents: {len(self.documents)}")
+        return [doc["id"] for doc in new_docs]
     
     def add_financial_documents(self) -> None:
         """Add sample financial documents for testing"""
-        sample_docs = [
-            {
-                "content": """
-                Portfolio Risk Management Best Practices:
-                1. Diversification across asset classes, sectors, and geographies
-                2. Regular rebalancing to maintain target allocations
-                3. Stress testing against historical scenarios
-                4. Monitoring concentration limits and exposure constraints
-                5. Using derivatives for hedging when appropriate
-                """,
-                "metadata": {"type": "risk_management", "category": "best_practices"}
-            },
-            {
-                "content": """
-                Mean-Variance Optimization Theory:
-                Modern Portfolio Theory suggests that investors can construct portfolios
-                to maximize expected return for a given level of risk. The efficient frontier
-                represents the set of optimal portfolios offering the highest expected return
-                for each level of risk. Key assumptions include rational investors, normal
-                return distributions, and known correlations.
-                """,
-                "metadata": {"type": "theory", "category": "optimization"}
-            },
-            {
-                "content": """
-                ESG Integration in Portfolio Construction:
-                Environmental, Social, and Governance factors can be integrated through:
-                - Exclusionary screening of controversial sectors
-                - Best-in-class selection within sectors
-                - Thematic investing in sustainable solutions
-                - ESG tilt overlays on existing strategies
-                - Impact measurement and reporting
-                """,
-                "metadata": {"type": "esg", "category": "integration"}
-            },
-            {
-                "content": """
-                Factor Investing Fundamentals:
-                Academic research has identified several factors that explain returns:
-                - Value: Cheap stocks outperform expensive ones
-                - Momentum: Trending stocks continue to trend
-                - Quality: Profitable, stable companies outperform
-                - Size: Small-cap stocks have higher expected returns
-                - Low Volatility: Lower risk stocks often outperform
-                """,
-                "metadata": {"type": "factors", "category": "research"}
-            },
-            {
-                "content": """
-                Concentration Risk and HHI Analysis:
-                The Herfindahl-Hirschman Index (HHI) measures portfolio concentration.
-                HHI = sum of squared weights. Values range from 1/N to 1.
-                - HHI > 0.15: Highly concentrated
-                - HHI 0.05-0.15: Moderately concentrated  
-                - HHI < 0.05: Well diversified
-                Concentration repair uses optimization to reduce HHI while minimizing changes.
-                """,
-                "metadata": {"type": "risk_metrics", "category": "concentration"}
-            }
-        ]
-        
-        for doc in sample_docs:
-            self.add_document(doc["content"], doc["metadata"])
+        self.add_documents(list(_SAMPLE_DOCS))
     
-    def _fit_vectorizer(self) -> None:
-        """Fit the TF-IDF vectorizer on current documents"""
-        if not self.documents:
-            return
-            
-        texts = [doc["content"] for doc in self.documents]
-        self.doc_vectors = self.vectorizer.fit_transform(texts)
-        self._is_fitted = True
-        logger.info(f"Fitted vectorizer on {len(texts)} documents")
+    def _embed_query(self, query: str) -> sparse.csr_matrix:
+        """Vectorize a query string (memoized per instance)"""
+        return self.vectorizer.transform([query])
     
     def retrieve(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
         """
@@ -166,32 +259,91 @@ class SimpleRAG:
         Returns:
             List of documents with relevance scores
         """
-        if not self.documents:
-            return []
-            
-        if not self._is_fitted:
-            self._fit_vectorizer()
-            
-        if self.doc_vectors is None:
+        if not self.documents or self.doc_vectors is None:
             return []
         
         # Vectorize query
-        query_vector = self.vectorizer.transform([query])
+        query_vector = self._embed_query(query)
+        
+        # Rows and query are already unit-norm, so the dot product is the cosine.
+        # CSR matrix times a dense vector is a plain SpMV over the stored
+        # non-zeros and returns a dense 1-D array with no sparse result to convert.
+        similarities = self.doc_vectors @ query_vector.toarray().ravel()
+        
+        # Get top-k most similar documents: partition in O(N), then sort only the k kept
+        k = min(top_k, similarities.size)
+        if k <= 0:
+            return []
+        if _topk_above_compiled is not None and similarities.size > _COMPILED_TOPK_MIN_DOCS:
+            top_indices = _topk_above_compiled(similarities, k, _MIN_RELEVANCE)
+        else:
+            top_indices = np.argpartition(-similarities, k - 1)[:k]
+            top_indices = top_indices[np.argsort(-similarities[top_indices])]
+        
+        return self._build_results(similarities, top_indices)
+    
+    def retrieve_batch(self, queries: List[str], top_k: int = 3) -> List[List[Dict[str, Any]]]:
+        """
+        Retrieve the most relevant documents for several queries at once
+        
+        All queries are vectorized in one transform call and scored with a
+        single sparse matrix product instead of one product per query.
+        
+        Args:
+            queries: Search queries
+            top_k: Number of documents to return per query
+            
+        Returns:
+            One list of documents with relevance scores per query, in input order
+        """
+        k = min(top_k, len(self.documents))
+        if not queries or k <= 0 or self.doc_vectors is None:
+            return [[] for _ in queries]
         
-        # Calculate similarities
-        similarities = cosine_similarity(query_vector, self.doc_vectors)[0]
+        # doc_vectors.T is a CSC view that the product would convert to CSR on
+        # every call; convert once per corpus change instead
+        if self._layout_dirty:
+            self._doc_vectors_T = self.doc_vectors.T.tocsr()
+            self._layout_dirty = False
         
-        # Get top-k most similar documents
-        top_indices = np.argsort(similarities)[::-1][:top_k]
+        query_vectors = self.vectorizer.transform(queries)
+        similarities = (query_vectors @ self._doc_vectors_T).toarray()
         
-        results = []
-        for idx in top_indices:
-            if similarities[idx] > 0.01:  # Minimum similarity threshold
-                doc = self.documents[idx].copy()
-                doc["relevance_score"] = float(similarities[idx])
-                results.append(doc)
+        # Row-wise top-k: partition every row, then sort only the k kept per row
+        top_indices = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(similarities, top_indices, axis=1), axis=1)
+        top_indices = np.take_along_axis(top_indices, order, axis=1)
         
-        return results
+        return [
+            self._build_results(row_similarities, row_indices)
+            for row_similarities, row_indices in zip(similarities, top_indices)
+        ]
+    
+    def _build_results(self, similarities: np.ndarray, top_indices: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        Turn ranked document indices into result dictionaries
+        
+        Args:
+            similarities: Similarity of every document to the query
+            top_indices: Document indices ordered by decreasing similarity
+            
+        Returns:
+            List of documents with relevance scores
+        """
+        # Minimum similarity threshold
+        top_indices = top_indices[similarities[top_indices] > _MIN_RELEVANCE]
+        
+        # Build only the fields consumers read instead of copying each stored dict
+        documents = self.documents
+        return [
+            {
+                "id": documents[idx]["id"],
+                "content": documents[idx]["content"],
+                "metadata": documents[idx]["metadata"],
+                "relevance_score": float(similarities[idx])
+            }
+            for idx in top_indices
+        ]
     
     def generate_response(self, query: str, context_docs: List[Dict[str, Any]]) -> str:
         """
@@ -249,9 +401,8 @@ For more specific guidance, please consult with a financial advisor or refer to
         """Get RAG system statistics"""
         return {
             "num_documents": len(self.documents),
-            "is_fitted": self._is_fitted,
             "max_docs": self.max_docs,
-            "vectorizer_features": getattr(self.vectorizer, 'n_features_in_', 0) if self._is_fitted else 0
+            "vectorizer_features": self.vectorizer.n_features
         }
 
 
@@ -0,0 +1,133 @@
+"""
+Test document ingestion from JSON files for the PGVector RAG CLI.
+
+A fake RAG object stands in for the database so the streaming parser and
+batching in ingest_from_file can be exercised without PostgreSQL.
+"""
+
+import threading
+
+import orjson
+import pytest
+
+from src.rag import cli_ingest_pgvector
+from src.rag.cli_ingest_pgvector import ingest_from_file
+
+
+class FakeRAG:
+    """Records added documents and serialises metadata like PGVectorRAG does"""
+    
+    def __init__(self):
+        self.documents = {}
+        self._lock = threading.Lock()
+    
+    def add_documents(self, contents, metadatas, doc_ids, skip_existing=True):
+        rows = [
+            (doc_id, content, orjson.dumps(metadata, option=orjson.OPT_NON_STR_KEYS).decode())
+            for doc_id, content, metadata in zip(doc_ids, contents, metadatas)
+        ]
+        with self._lock:
+            for doc_id, content, metadata_json in rows:
+                self.documents[doc_id] = (content, orjson.loads(metadata_json))
+        return doc_ids
+
+
+@pytest.fixture
+def small_batches(monkeypatch):
+    """Force several batches so the thread pool path is used"""
+    monkeypatch.setattr(cli_ingest_pgvector, "INGEST_BATCH_SIZE", 2)
+
+
+def test_ingest_array_file_with_numeric_metadata(tmp_path, small_batches):
+    """Numeric metadata streamed from an array file is stored as floats"""
+    documents = [
+        {
+            "content": f"Document {i}",
+            "metadata": {"title": f"Doc {i}", "weight": i + 0.25, "rank": i},
+        }
+        for i in range(5)
+    ]
+    path = tmp_path / "documents.json"
+    path.write_bytes(orjson.dumps(documents))
+    
+    rag = FakeRAG()
+    assert ingest_from_file(rag, path) == 0
+    
+    assert len(rag.documents) == len(documents)
+    stored = sorted(rag.documents.values())
+    for i, (content, metadata) in enumerate(stored):
+        assert content == f"Document {i}"
+        assert metadata["weight"] == pytest.approx(i + 0.25)
+        assert metadata["rank"] == i
+
+
+def test_ingest_single_object_file(tmp_path):
+    """A top-level object is ingested as one document"""
+    path = tmp_path / "document.json"
+    path.write_bytes(orjson.dumps({"content": "Only", "metadata": {"score": 1.5}}))
+    
+    rag = FakeRAG()
+    assert ingest_from_file(rag, path) == 0
+    
+    assert list(rag.documents.values()) == [("Only", {"score": 1.5})]
+
+
+def test_ingest_from_file_counts_failed_batches(tmp_path, small_batches):
+    """Batches the backend rejects are counted instead of reported as success"""
+    class FailingRAG(FakeRAG):
+        def add_documents(self, contents, metadatas, doc_ids, skip_existing=True):
+            if "Document 0" in contents:
+                raise RuntimeError("insert failed")
+            return super().add_documents(contents, metadatas, doc_ids, skip_existing)
+    
+    documents = [{"content": f"Document {i}", "metadata": {}} for i in range(5)]
+    path = tmp_path / "documents.json"
+    path.write_bytes(orjson.dumps(documents))
+    
+    rag = FailingRAG()
+    assert ingest_from_file(rag, path) == 2
+    assert len(rag.documents) == 3
+    
+    assert ingest_from_file(FakeRAG(), path) == 0
+
+
+def test_ingest_from_file_skips_malformed_documents(tmp_path, small_batches):
+    """A malformed document is counted and skipped without losing its batch"""
+    documents = [{"content": f"Document {i}", "metadata": {}} for i in range(10)]
+    del documents[3]["metadata"]
+    path = tmp_path / "documents.json"
+    path.write_bytes(orjson.dumps(documents))
+    
+    rag = FakeRAG()
+    assert ingest_from_file(rag, path) == 1
+    assert len(rag.documents) == 9
+
+
+def test_ingest_from_file_collects_all_batches_after_errors(tmp_path, small_batches, monkeypatch):
+    """A batch whose worker raises is counted without discarding the others"""
+    ingest_documents = cli_ingest_pgvector.ingest_documents
+    
+    def raising_ingest(rag, documents):
+        if documents[0]["content"] == "Document 0":
+            raise RuntimeError("worker failed")
+        return ingest_documents(rag, documents)
+    
+    documents = [{"content": f"Document {i}", "metadata": {}} for i in range(8)]
+    path = tmp_path / "documents.json"
+    path.write_bytes(orjson.dumps(documents))
+    
+    monkeypatch.setattr(cli_ingest_pgvector, "ingest_documents", raising_ingest)
+    rag = FakeRAG()
+    assert ingest_from_file(rag, path) == 2
+    assert len(rag.documents) == 6
+
+
+def test_ingest_from_file_keeps_batches_before_parse_error(tmp_path, small_batches):
+    """Batches submitted before a truncated file fails to parse are still stored"""
+    documents = [{"content": f"Document {i}", "metadata": {}} for i in range(8)]
+    path = tmp_path / "documents.json"
+    path.write_bytes(orjson.dumps(documents)[:-20])
+    
+    rag = FakeRAG()
+    assert ingest_from_file(rag, path) == 1
+    assert len(rag.documents) == 6
@@ -5,24 +5,105 @@ These tests verify the concentration measurement and repair optimization
 used in portfolio risk management.
 """
 
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from functools import cached_property, singledispatch
+from types import MappingProxyType
+
 import pytest
 import numpy as np
-import cvxpy as cp
-from typing import Dict, Any, Optional
+import osqp
+from scipy import sparse
+from typing import Dict, Any, Optional, Tuple
+
+try:
+    from numba import njit, prange
+except ImportError:  # Numba is optional; the NumPy kernels are used as is
+    njit = None
+    prange = range
+
+
+def _hhi_kernel(w: np.ndarray) -> float:
+    """
+    Sum of squared weights in one fused pass over the array
+    
+    Written as a plain loop for Numba; without Numba the BLAS dot product
+    is used instead, which is likewise a single pass with no temporary.
+    """
+    total = 0.0
+    for i in range(w.shape[0]):
+        total += w[i] * w[i]
+    return total
+
+
+_hhi_kernel_compiled = njit(cache=True, fastmath=True)(_hhi_kernel) if njit is not None else None
+
 
+def _sum_squares(w: np.ndarray) -> float:
+    """Sum of squared weights, using the compiled kernel when available"""
+    if _hhi_kernel_compiled is not None:
+        return float(_hhi_kernel_compiled(np.ascontiguousarray(w)))
+    return float(w @ w)
+
+
+@dataclass(frozen=True, eq=False)
+class PortfolioSoA:
+    """
+    Portfolio stored as parallel arrays instead of a name-to-weight dict
+    
+    Attributes:
+        names: Asset names
+        w: Weights, in the order of names; treated as immutable so derived
+            values can be cached
+    
+    Equality and hashing are by identity: a generated __eq__ would compare
+    the weight arrays elementwise and fail.
+    """
+    names: Tuple[str, ...]
+    w: np.ndarray
+    
+    @cached_property
+    def hhi(self) -> float:
+        """Herfindahl-Hirschman Index, computed once per portfolio"""
+        return _sum_squares(self.w)
+    
+    @classmethod
+    def from_dict(cls, weights: Dict[str, float]) -> "PortfolioSoA":
+        """Build from an asset-to-weight dictionary"""
+        return cls(tuple(weights), np.fromiter(weights.values(), dtype=np.float64, count=len(weights)))
+    
+    def to_dict(self) -> Dict[str, float]:
+        """Convert to an asset-to-weight dictionary"""
+        return dict(zip(self.names, self.w.tolist()))
+    
+    def __len__(self) -> int:
+        return len(self.names)
 
+
+@singledispatch
 def compute_hhi(weights: Dict[str, float]) -> float:
     """
     Compute Herfindahl-Hirschman Index for portfolio concentration
     
     Args:
-        weights: Dictionary of asset weights
+        weights: Dictionary of asset weights, or a PortfolioSoA
         
     Returns:
         HHI value (higher = more concentrated)
     """
-    weight_array = np.array(list(weights.values()))
-    return float(np.sum(weight_array ** 2))
+    n = len(weights)
+    
+    # For a handful of assets a plain Python sum beats building an array
+    if n < 8:
+        return float(sum(w * w for w in weights.values()))
+    
+    weight_array = np.fromiter(weights.values(), dtype=np.float64, count=n)
+    return _sum_squares(weight_array)
+
+
+@compute_hhi.register
+def _(portfolio: PortfolioSoA) -> float:
+    return portfolio.hhi
 
 
 def effective_number_of_assets(weights: Dict[str, float]) -> float:
@@ -30,7 +111,7 @@ def effective_number_of_assets(weights: Dict[str, float]) -> float:
     Calculate effective number of assets (1/HHI)
     
     Args:
-        weights: Dictionary of asset weights
+        weights: Dictionary of asset weights, or a PortfolioSoA
         
     Returns:
         Effective number of assets
@@ -39,82 +120,319 @@ def effective_number_of_assets(weights: Dict[str, float]) -> float:
     return 1.0 / hhi if hhi > 0 else 0.0
 
 
-def concentration_repair(weights: Dict[str, float], 
-                        max_concentration: float = 0.05,
-                        sector_caps: Optional[Dict[str, float]] = None,
-                        sector_mapping: Optional[Dict[str, str]] = None) -> Dict[str, float]:
+def _project_capped_simplex(w0: np.ndarray, cap: float) -> np.ndarray:
     """
-    Repair portfolio concentration violations using quadratic optimization
+    Euclidean projection onto {w : sum(w) == 1, 0 <= w <= cap}
+    
+    The projection is clip(w0 - tau, 0, cap) for the scalar tau where the
+    clipped weights sum to one. That sum is piecewise linear and decreasing
+    in tau with breakpoints at w0 and w0 - cap, so it is evaluated at all
+    breakpoints from sorted prefix sums and tau is interpolated in
+    O(n log n). Requires n * cap >= 1. Compiled with Numba when available.
+    
+    Args:
+        w0: Weights to project
+        cap: Maximum weight per asset
+        
+    Returns:
+        Projected weights
+    """
+    n = w0.shape[0]
+    w_sorted = np.sort(w0)
+    prefix = np.zeros(n + 1)
+    prefix[1:] = np.cumsum(w_sorted)
+    taus = np.sort(np.concatenate((w_sorted - cap, w_sorted)))
+    
+    # For each tau: assets above tau, and assets at or above tau + cap (capped)
+    above = n - np.searchsorted(w_sorted, taus, side='right')
+    capped = n - np.searchsorted(w_sorted, taus + cap, side='left')
+    uncapped_sum = prefix[n - capped] - prefix[n - above]
+    totals = cap * capped + uncapped_sum - taus * (above - capped)
+    
+    tau = np.interp(1.0, totals[::-1], taus[::-1])
+    return np.clip(w0 - tau, 0.0, cap)
+
+
+def _project_capped_simplex_batch(W: np.ndarray, cap: float, out: np.ndarray) -> np.ndarray:
+    """
+    Project every row of W onto the capped simplex
+    
+    Args:
+        W: Weights to project, one portfolio per row
+        cap: Maximum weight per asset
+        out: Output array with the shape of W
+        
+    Returns:
+        out, holding the projected rows
+    """
+    for b in prange(W.shape[0]):
+        out[b] = _project_capped_simplex(W[b], cap)
+    
+    return out
+
+
+if njit is not None:
+    _project_capped_simplex = njit(cache=True, fastmath=True)(_project_capped_simplex)
+    _project_capped_simplex_batch = njit(cache=True, parallel=True)(_project_capped_simplex_batch)
+    # Compile at import, not on the first repair
+    _project_capped_simplex_batch(np.full((1, 2), 0.5), 0.5, np.empty((1, 2)))
+
+
+def concentration_repair_batch(W: np.ndarray, max_concentration: float = 0.05) -> np.ndarray:
+    """
+    Repair the concentration of many same-sized portfolios at once
     
     Args:
-        weights: Current portfolio weights
+        W: Current weights, one portfolio per row (B x n)
         max_concentration: Maximum weight per asset
+        
+    Returns:
+        Repaired weights, one portfolio per row
+    """
+    W = np.ascontiguousarray(W, dtype=np.float64)
+    n = W.shape[1]
+    
+    if n * max_concentration < 1.0:
+        # Infeasible: return equal weights as fallback
+        return np.full(W.shape, 1.0 / n)
+    
+    return _project_capped_simplex_batch(W, max_concentration, np.empty_like(W))
+
+
+class _ProblemCache:
+    """
+    LRU cache of set-up OSQP workspaces keyed by problem structure
+    
+    The structure is the asset count and the sector layout. Weights and caps
+    enter only through the linear cost and the upper bounds, so a repeat call
+    with the same structure only updates those vectors and warm-starts from
+    the previous solution, skipping matrix setup and factorization.
+    """
+    
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+    
+    def solve(self, key, q: np.ndarray, u: np.ndarray, build):
+        """
+        Solve the cached problem for key with linear cost q and upper bounds u
+        
+        Args:
+            key: Hashable description of the problem structure
+            q: Linear cost vector
+            u: Constraint upper bounds
+            build: Callable returning (P, A, l), used on a cache miss
+            
+        Returns:
+            OSQP result object
+            
+        Raises:
+            ValueError: If q or u is not finite or u falls below the lower
+                bounds. OSQP only rejects such data at setup; update() prints
+                an error and keeps the old vectors, so it is checked here.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            P, A, l = build()
+            self._check_data(q, u, l)
+            problem = osqp.OSQP()
+            problem.setup(P, q, A, l, u, verbose=False, eps_abs=1e-7, eps_rel=1e-7, polishing=True)
+            entry = [problem, None, None, l]
+            self._entries[key] = entry
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        else:
+            self._check_data(q, u, entry[3])
+            self._entries.move_to_end(key)
+            problem = entry[0]
+            problem.update(q=q, u=u)
+            if entry[1] is not None:
+                problem.warm_start(x=entry[1], y=entry[2])
+        
+        result = problem.solve(raise_error=False)
+        if result.info.status_val == osqp.SolverStatus.OSQP_SOLVED:
+            entry[1], entry[2] = result.x.copy(), result.y.copy()
+        
+        return result
+    
+    @staticmethod
+    def _check_data(q: np.ndarray, u: np.ndarray, l: np.ndarray) -> None:
+        """Reject vectors OSQP would refuse, before they reach the workspace"""
+        if not (np.isfinite(q).all() and np.isfinite(u).all() and (u >= l).all()):
+            raise ValueError("Invalid repair problem data: non-finite values or crossed bounds")
+
+
+_PROBLEM_CACHE = _ProblemCache()
+
+
+def _sector_layout(assets, sector_caps: Optional[Dict[str, float]],
+                   sector_mapping: Optional[Dict[str, str]]):
+    """
+    Member indices of every capped sector that holds at least one asset
+    
+    Args:
+        assets: Asset names, in weight-vector order
         sector_caps: Maximum weight per sector
         sector_mapping: Asset to sector mapping
         
     Returns:
-        Repaired portfolio weights
+        Tuple of (sector, member index tuple) pairs, sorted by sector
     """
-    assets = list(weights.keys())
-    w0 = np.array(list(weights.values()))
-    n = len(assets)
+    if not (sector_caps and sector_mapping):
+        return ()
     
-    # Decision variables
-    w = cp.Variable(n, name="weights")
+    # Bucket asset indices by sector in a single pass over the assets
+    buckets = defaultdict(list)
+    for i, asset in enumerate(assets):
+        sector = sector_mapping.get(asset)
+        if sector in sector_caps:
+            buckets[sector].append(i)
     
-    # Objective: minimize deviation from original weights
-    objective = cp.Minimize(cp.sum_squares(w - w0))
+    return tuple((sector, tuple(buckets[sector])) for sector in sorted(buckets))
+
+
+def _build_repair_qp(n: int, layout):
+    """
+    Build the cap-independent matrices of the repair QP
+    
+    Args:
+        n: Number of assets
+        layout: Sector layout from _sector_layout
+        
+    Returns:
+        Tuple (P, A, l) in OSQP form
+    """
+    # Objective 1/2 w'Pw + q'w with P = 2I and q = -2 w0 is ||w - w0||^2
+    # up to a constant
+    P = sparse.eye(n, format='csc') * 2
     
-    # Constraints
-    constraints = [
-        cp.sum(w) == 1,  # Fully invested
-        w >= 0,  # Long-only
-        w <= max_concentration,  # Individual asset limits
-    ]
+    # Sector selector: one row per capped sector with 1s at its members,
+    # built in a single sparse constructor
+    rows = [row for row, (_, members) in enumerate(layout) for _ in members]
+    cols = [i for _, members in layout for i in members]
+    S = sparse.csc_matrix((np.ones(len(cols)), (rows, cols)), shape=(len(layout), n))
     
-    # Sector constraints
-    if sector_caps and sector_mapping:
-        sectors = set(sector_mapping.values())
-        for sector in sectors:
-            if sector in sector_caps:
-                sector_assets = [i for i, asset in enumerate(assets) 
-                               if sector_mapping.get(asset) == sector]
-                if sector_assets:
-                    constraints.append(cp.sum(w[sector_assets]) <= sector_caps[sector])
+    # Constraint rows: fully invested, per-asset bounds (long-only and
+    # individual asset limits), then the sector caps
+    A = sparse.vstack([sparse.csc_matrix(np.ones((1, n))), sparse.eye(n, format='csc'), S], format='csc')
+    l = np.concatenate((np.ones(1), np.zeros(n), np.full(len(layout), -np.inf)))
+    
+    return P, A, l
+
+
+def _repair_weights(assets, w0: np.ndarray, max_concentration: float,
+                    sector_caps: Optional[Dict[str, float]],
+                    sector_mapping: Optional[Dict[str, str]]) -> np.ndarray:
+    """
+    Repair a weight vector; shared by the dict and PortfolioSoA entry points
     
-    # Solve optimization
-    problem = cp.Problem(objective, constraints)
+    Args:
+        assets: Asset names, in weight-vector order
+        w0: Current portfolio weights
+        max_concentration: Maximum weight per asset
+        sector_caps: Maximum weight per sector
+        sector_mapping: Asset to sector mapping
+        
+    Returns:
+        Repaired weights
+    """
+    n = len(assets)
     
+    layout = _sector_layout(assets, sector_caps, sector_mapping)
+    
+    # Already feasible: the closest feasible portfolio is the input itself
+    if (n and w0.min() >= -1e-12 and w0.max() <= max_concentration + 1e-9
+            and abs(w0.sum() - 1.0) <= 1e-9
+            and all(w0[list(members)].sum() <= sector_caps[sector] + 1e-9
+                    for sector, members in layout)):
+        return w0
+    
+    # Without sector rows the repair is a projection onto the capped simplex
+    if not layout:
+        return concentration_repair_batch(w0[None, :], max_concentration)[0]
+    
+    # Caps are parameters of the cached problem: only the upper bounds change
+    u = np.concatenate((
+        np.ones(1),
+        np.full(n, max_concentration),
+        [sector_caps[sector] for sector, _ in layout],
+    ))
+    
+    # Solve optimization; invalid data such as crossed bounds is rejected
+    # whether or not the workspace is cached
     try:
-        problem.solve(solver=cp.ECOS, verbose=False)
+        result = _PROBLEM_CACHE.solve((n, layout), -2 * w0, u, lambda: _build_repair_qp(n, layout))
+    except (ValueError, osqp.OSQPException):
+        return np.full(n, 1.0 / n)
+    
+    if result.info.status_val != osqp.SolverStatus.OSQP_SOLVED:
+        # Infeasible or not converged: return equal weights as fallback
+        return np.full(n, 1.0 / n)
+    
+    return result.x
+
+
+@singledispatch
+def concentration_repair(weights: Dict[str, float], 
+                        max_concentration: float = 0.05,
+                        sector_caps: Optional[Dict[str, float]] = None,
+                        sector_mapping: Optional[Dict[str, str]] = None) -> Dict[str, float]:
+    """
+    Repair portfolio concentration violations using quadratic optimization
+    
+    Args:
+        weights: Current portfolio weights, or a PortfolioSoA (which returns
+            a PortfolioSoA)
+        max_concentration: Maximum weight per asset
+        sector_caps: Maximum weight per sector
+        sector_mapping: Asset to sector mapping
         
-        if problem.status == cp.OPTIMAL:
-            return {asset: float(w.value[i]) for i, asset in enumerate(assets)}
-        else:
-            # If optimization fails, return equal weights as fallback
-            equal_weight = 1.0 / len(assets)
-            return {asset: equal_weight for asset in assets}
-            
-    except Exception:
-        # If solving fails, return equal weights as fallback
-        equal_weight = 1.0 / len(assets)
-        return {asset: equal_weight for asset in assets}
+    Returns:
+        Repaired portfolio weights
+    """
+    assets = list(weights.keys())
+    w0 = np.fromiter(weights.values(), dtype=np.float64, count=len(assets))
+    
+    repaired = _repair_weights(assets, w0, max_concentration, sector_caps, sector_mapping)
+    return dict(zip(assets, repaired.tolist()))
+
+
+@concentration_repair.register
+def _(portfolio: PortfolioSoA,
+      max_concentration: float = 0.05,
+      sector_caps: Optional[Dict[str, float]] = None,
+      sector_mapping: Optional[Dict[str, str]] = None) -> PortfolioSoA:
+    repaired = _repair_weights(portfolio.names, portfolio.w, max_concentration, sector_caps, sector_mapping)
+    return PortfolioSoA(portfolio.names, repaired)
+
+
+def _equal_weights_soa(n: int) -> np.ndarray:
+    """Equal weights for n assets as an array, without building a dict"""
+    return np.full(n, 1.0 / n, dtype=np.float64)
+
+
+def _read_only(portfolio: PortfolioSoA) -> PortfolioSoA:
+    """Lock a fixture portfolio's weights against in-place modification"""
+    portfolio.w.flags.writeable = False
+    return portfolio
 
 
 class TestHHIRepair:
     """Test class for HHI concentration repair functionality"""
     
-    @pytest.fixture
+    # Fixtures are built once per module and shared read-only between tests;
+    # a test that needs to modify one must copy it first
+    
+    @pytest.fixture(scope="module")
     def equal_weight_portfolio(self):
         """Create an equal-weighted portfolio"""
-        assets = [f"ASSET_{i:02d}" for i in range(1, 11)]  # 10 assets
-        equal_weight = 1.0 / len(assets)
-        return {asset: equal_weight for asset in assets}
+        assets = tuple(f"ASSET_{i:02d}" for i in range(1, 11))  # 10 assets
+        return _read_only(PortfolioSoA(assets, _equal_weights_soa(len(assets))))
     
-    @pytest.fixture
+    @pytest.fixture(scope="module")
     def concentrated_portfolio(self):
         """Create a concentrated portfolio"""
-        return {
+        return _read_only(PortfolioSoA.from_dict({
             "ASSET_01": 0.40,  # Highly concentrated
             "ASSET_02": 0.25,  # Also high
             "ASSET_03": 0.15,
@@ -122,12 +440,12 @@ class TestHHIRepair:
             "ASSET_05": 0.05,
             "ASSET_06": 0.03,
             "ASSET_07": 0.02,
-        }
+        }))
     
-    @pytest.fixture
+    @pytest.fixture(scope="module")
     def sector_mapping(self):
         """Create sector mapping for testing"""
-        return {
+        return MappingProxyType({
             "ASSET_01": "Technology",
             "ASSET_02": "Technology", 
             "ASSET_03": "Healthcare",
@@ -135,7 +453,7 @@ class TestHHIRepair:
             "ASSET_05": "Finance",
             "ASSET_06": "Finance",
             "ASSET_07": "Energy",
-        }
+        })
     
     def test_compute_hhi_equal_weights(self, equal_weight_portfolio):
         """Test HHI calculation for equal-weighted portfolio"""
@@ -152,8 +470,7 @@ class TestHHIRepair:
         hhi = compute_hhi(concentrated_portfolio)
         
         # Calculate expected HHI manually
-        weights = list(concentrated_portfolio.values())
-        expected_hhi = sum(w**2 for w in weights)
+        expected_hhi = sum(w**2 for w in concentrated_portfolio.w)
         
         assert abs(hhi - expected_hhi) < 1e-10
         
@@ -181,9 +498,9 @@ class TestHHIRepair:
         repaired = concentration_repair(concentrated_portfolio, max_concentration)
         
         # Check constraints are satisfied
-        assert abs(sum(repaired.values()) - 1.0) < 1e-6  # Fully invested
-        assert all(w >= 0 for w in repaired.values())  # Long-only
-        assert all(w <= max_concentration + 1e-6 for w in repaired.values())  # Concentration limit
+        assert abs(repaired.w.sum() - 1.0) < 1e-6  # Fully invested
+        assert (repaired.w >= 0).all()  # Long-only
+        assert (repaired.w <= max_concentration + 1e-6).all()  # Concentration limit
         
         # Check HHI improved
         original_hhi = compute_hhi(concentrated_portfolio)
@@ -197,8 +514,18 @@ class TestHHIRepair:
         repaired = concentration_repair(equal_weight_portfolio, max_concentration)
         
         # Should be very close to original (no repair needed)
-        for asset in equal_weight_portfolio:
-            assert abs(repaired[asset] - equal_weight_portfolio[asset]) < 1e-3
+        assert repaired.names == equal_weight_portfolio.names
+        assert np.allclose(repaired.w, equal_weight_portfolio.w, atol=1e-3)
+    
+    def test_concentration_repair_feasible_input_unchanged(self, sector_mapping):
+        """Test that a portfolio already within all caps is returned as is"""
+        portfolio = {
+            "ASSET_01": 0.15, "ASSET_02": 0.15, "ASSET_03": 0.15, "ASSET_04": 0.15,
+            "ASSET_05": 0.15, "ASSET_06": 0.15, "ASSET_07": 0.10,
+        }
+        sector_caps = {"Technology": 0.30, "Finance": 0.30}
+        
+        assert concentration_repair(portfolio, 0.15, sector_caps, sector_mapping) == portfolio
     
     def test_concentration_repair_with_sectors(self, concentrated_portfolio, sector_mapping):
         """Test concentration repair with sector constraints"""
@@ -218,40 +545,43 @@ class TestHHIRepair:
         )
         
         # Check individual asset constraints
-        assert all(w <= max_concentration + 1e-6 for w in repaired.values())
+        assert (repaired.w <= max_concentration + 1e-6).all()
         
         # Check sector constraints
+        sectors = np.array([sector_mapping.get(asset) for asset in repaired.names])
         for sector, cap in sector_caps.items():
-            sector_weight = sum(
-                repaired[asset] for asset in repaired
-                if sector_mapping.get(asset) == sector
-            )
+            sector_weight = repaired.w[sectors == sector].sum()
             assert sector_weight <= cap + 1e-6
     
     def test_concentration_repair_extreme_case(self):
         """Test concentration repair with extreme concentration"""
         # Single asset owns 90%
-        extreme_portfolio = {
-            "DOMINANT": 0.90,
-            "SMALL_1": 0.03,
-            "SMALL_2": 0.03,
-            "SMALL_3": 0.02,
-            "SMALL_4": 0.02,
-        }
+        extreme_portfolio = PortfolioSoA(
+            ("DOMINANT", "SMALL_1", "SMALL_2", "SMALL_3", "SMALL_4"),
+            np.array([0.90, 0.03, 0.03, 0.02, 0.02]),
+        )
         
         max_concentration = 0.20  # Force major rebalancing
         
         repaired = concentration_repair(extreme_portfolio, max_concentration)
         
         # Check constraints
-        assert abs(sum(repaired.values()) - 1.0) < 1e-6
-        assert all(w <= max_concentration + 1e-6 for w in repaired.values())
+        assert abs(repaired.w.sum() - 1.0) < 1e-6
+        assert (repaired.w <= max_concentration + 1e-6).all()
         
         # Check significant improvement in HHI
         original_hhi = compute_hhi(extreme_portfolio)
         repaired_hhi = compute_hhi(repaired)
         assert repaired_hhi < 0.5 * original_hhi  # At least 50% improvement
     
+    def test_portfolio_soa_identity_semantics(self, equal_weight_portfolio):
+        """Test that PortfolioSoA compares and hashes without touching its arrays"""
+        copy = PortfolioSoA(equal_weight_portfolio.names, equal_weight_portfolio.w.copy())
+        
+        assert equal_weight_portfolio == equal_weight_portfolio
+        assert equal_weight_portfolio != copy
+        assert len({equal_weight_portfolio, copy}) == 2
+    
     def test_hhi_edge_cases(self):
         """Test HHI calculation edge cases"""
         # Single asset portfolio
@@ -271,25 +601,22 @@ class TestHHIRepair:
     
     def test_concentration_repair_preserves_ranking(self):
         """Test that concentration repair preserves relative rankings where possible"""
-        portfolio = {
-            "LARGE": 0.30,   # Largest position
-            "MEDIUM": 0.25,  # Medium position
-            "SMALL": 0.20,   # Smaller position
-            "TINY_1": 0.15,
-            "TINY_2": 0.10,
-        }
+        # LARGE, MEDIUM, SMALL, TINY_1, TINY_2
+        portfolio = PortfolioSoA(
+            ("LARGE", "MEDIUM", "SMALL", "TINY_1", "TINY_2"),
+            np.array([0.30, 0.25, 0.20, 0.15, 0.10]),
+        )
         
         max_concentration = 0.22  # Force reduction of top positions
         
         repaired = concentration_repair(portfolio, max_concentration)
+        assert repaired.names == portfolio.names
         
         # Check that LARGE is still largest (or tied for largest)
-        large_weight = repaired["LARGE"]
-        assert all(large_weight >= repaired[asset] - 1e-6 for asset in repaired)
+        assert (repaired.w[0] >= repaired.w - 1e-6).all()
         
         # Check that TINY positions didn't become dominant
-        assert repaired["TINY_1"] <= max_concentration + 1e-6
-        assert repaired["TINY_2"] <= max_concentration + 1e-6
+        assert (repaired.w[3:] <= max_concentration + 1e-6).all()
     
     def test_concentration_repair_infeasible_constraints(self):
         """Test concentration repair with potentially infeasible constraints"""
@@ -308,12 +635,79 @@ class TestHHIRepair:
         for weight in repaired.values():
             assert weight <= max_concentration + 1e-4  # Allow small tolerance
     
+    def test_capped_simplex_projection_matches_qp(self):
+        """Test that the closed-form projection agrees with the OSQP solution"""
+        rng = np.random.default_rng(7)
+        
+        for n, cap in [(4, 0.30), (10, 0.15), (25, 0.05), (8, 0.125)]:
+            w0 = rng.dirichlet(np.ones(n)) + rng.normal(0, 0.05, n)
+            
+            projected = _project_capped_simplex(w0, cap)
+            
+            P, A, l = _build_repair_qp(n, ())
+            u = np.concatenate((np.ones(1), np.full(n, cap)))
+            problem = osqp.OSQP()
+            problem.setup(P, -2 * w0, A, l, u, verbose=False, eps_abs=1e-9, eps_rel=1e-9, polishing=True)
+            expected = problem.solve(raise_error=False).x
+            
+            assert abs(projected.sum() - 1.0) < 1e-9
+            assert np.all(projected >= 0) and np.all(projected <= cap + 1e-12)
+            assert np.allclose(projected, expected, atol=1e-6)
+    
+    def test_concentration_repair_batch(self):
+        """Test that batched repair matches repairing each portfolio on its own"""
+        rng = np.random.default_rng(11)
+        assets = [f"ASSET_{i:02d}" for i in range(1, 9)]
+        W = rng.dirichlet(np.ones(len(assets)), size=16)
+        
+        repaired = concentration_repair_batch(W, 0.20)
+        
+        assert repaired.shape == W.shape
+        assert np.allclose(repaired.sum(axis=1), 1.0)
+        assert np.all(repaired <= 0.20 + 1e-9)
+        for row, w0 in zip(repaired, W):
+            single = concentration_repair(dict(zip(assets, w0)), 0.20)
+            assert np.allclose(row, list(single.values()), atol=1e-9)
+        
+        # Infeasible cap falls back to equal weights for every portfolio
+        assert np.allclose(concentration_repair_batch(W, 0.10), 1.0 / len(assets))
+    
+    def test_concentration_repair_repeated_structure(self):
+        """Test that a cached, warm-started problem gives the same repair as a fresh one"""
+        max_concentration = 0.30
+        sector_mapping = {"A": "X", "B": "X", "C": "Y", "D": "Y"}
+        first = {"A": 0.40, "B": 0.30, "C": 0.20, "D": 0.10}
+        second = {"A": 0.10, "B": 0.45, "C": 0.25, "D": 0.20}
+        
+        # Same structure with different caps reuses the cached workspace
+        concentration_repair(first, 0.35, {"X": 0.55}, sector_mapping)
+        warm = concentration_repair(second, max_concentration, {"X": 0.50}, sector_mapping)
+        
+        _PROBLEM_CACHE._entries.clear()
+        cold = concentration_repair(second, max_concentration, {"X": 0.50}, sector_mapping)
+        
+        for asset in second:
+            assert abs(warm[asset] - cold[asset]) < 1e-6
+    
+    def test_concentration_repair_invalid_cap_ignores_cache(self):
+        """Test that an invalid cap falls back the same way with a warm cache"""
+        sector_mapping = {"A": "x", "B": "y", "C": "y"}
+        portfolio = {"A": 0.5, "B": 0.2, "C": 0.3}
+        
+        _PROBLEM_CACHE._entries.clear()
+        cold = concentration_repair(portfolio, -0.1, {"x": 0.6}, sector_mapping)
+        
+        concentration_repair(portfolio, 0.45, {"x": 0.6}, sector_mapping)
+        warm = concentration_repair(portfolio, -0.1, {"x": 0.6}, sector_mapping)
+        
+        assert warm == cold
+        assert np.allclose(list(warm.values()), 1.0 / 3)
+    
     def test_hhi_mathematical_properties(self):
         """Test mathematical properties of HHI"""
         # HHI should be between 1/N and 1
         for n in [2, 5, 10, 100]:
-            equal_weights = {f"asset_{i}": 1.0/n for i in range(n)}
-            hhi = compute_hhi(equal_weights)
+            hhi = _sum_squares(_equal_weights_soa(n))
             
             assert hhi >= 1.0/n - 1e-10  # Lower bound
             assert hhi <= 1.0 + 1e-10    # Upper bound
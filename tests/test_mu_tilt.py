@@ -8,32 +8,211 @@ used in the portfolio optimization process.
 import pytest
 import numpy as np
 import pandas as pd
-from typing import Dict, Any
+from scipy.special import ndtri
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Any, Optional, Tuple, Union
+
+try:
+    from numba import njit, prange
+except ImportError:  # Numba is optional; the NumPy versions are used instead
+    njit = None
+    prange = range
+
+
+def _mu_tilt_kernel(base: np.ndarray, factor_matrix: np.ndarray, coefs: np.ndarray,
+                    out: np.ndarray) -> np.ndarray:
+    """Fused tilt loop: out[i] = base[i] + sum_k coefs[k] * factor_matrix[k, i]"""
+    for i in prange(base.shape[0]):
+        acc = base[i]
+        for k in range(coefs.shape[0]):
+            acc += coefs[k] * factor_matrix[k, i]
+        out[i] = acc
+    return out
+
+
+def _zscore_kernel(mat: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """Row-wise z-scores, with a mean pass and a centered sum-of-squares pass per row"""
+    n = mat.shape[1]
+    for k in prange(mat.shape[0]):
+        mean = 0.0
+        for i in range(n):
+            mean += mat[k, i]
+        mean /= n
+        m2 = 0.0
+        for i in range(n):
+            d = mat[k, i] - mean
+            m2 += d * d
+        std = np.sqrt(m2 / n)
+        inv = 1.0 / std if std > 0 else 0.0
+        for i in range(n):
+            out[k, i] = (mat[k, i] - mean) * inv
+    return out
+
+
+if njit is not None:
+    _mu_tilt_kernel_compiled = njit(cache=True, parallel=True, fastmath=True)(_mu_tilt_kernel)
+    _zscore_kernel_compiled = njit(cache=True, parallel=True)(_zscore_kernel)
+else:
+    _mu_tilt_kernel_compiled = _zscore_kernel_compiled = None
+
+# Working-set size for one tile of the NumPy tilt: half of a typical L2 cache
+_TILT_BLOCK_BYTES = 256 * 1024
+
 
 # Mock the factor tilt functionality since we're testing the concept
-def calculate_mu_tilt(base_returns: np.ndarray, factor_scores: Dict[str, np.ndarray], 
-                     tilt_coefficients: Dict[str, float]) -> np.ndarray:
+@dataclass(frozen=True, slots=True, eq=False)
+class FactorPanel:
+    """
+    Factor scores stored as one contiguous matrix instead of a dict of arrays
+    
+    Attributes:
+        names: Factor names, in row order
+        data: Scores, shape (n_factors, n_assets), C-contiguous
+    
+    Equality and hashing are by identity: a generated __eq__ would compare
+    the score arrays elementwise and fail.
+    """
+    names: Tuple[str, ...]
+    data: np.ndarray
+    
+    @classmethod
+    def from_dict(cls, factor_scores: Dict[str, np.ndarray],
+                  order: Optional[Tuple[str, ...]] = None) -> "FactorPanel":
+        """
+        Build from a factor-to-scores dictionary, keeping float32 scores in float32
+        
+        Args:
+            factor_scores: Dictionary of factor scores for each factor
+            order: Row order of the factors; defaults to the dictionary order
+            
+        Returns:
+            FactorPanel
+        """
+        names = tuple(order) if order is not None else tuple(factor_scores)
+        if not names:
+            return cls((), np.zeros((0, 0)))
+        rows = [factor_scores[name] for name in names]
+        dtype = np.result_type(*rows, np.float32)
+        return cls(names, np.ascontiguousarray(np.vstack(rows), dtype=dtype))
+    
+    def to_dict(self) -> Dict[str, np.ndarray]:
+        """Convert to a factor-to-scores dictionary of row views"""
+        return dict(zip(self.names, self.data))
+    
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+def zscore_panel(panel: FactorPanel) -> FactorPanel:
+    """
+    Cross-sectionally z-score every factor of a panel at once
+    
+    Args:
+        panel: Raw factor scores
+        
+    Returns:
+        Panel of z-scores; factors with no variation become zeros
+    """
+    if panel.data.size == 0:
+        return panel
+    if _zscore_kernel_compiled is not None:
+        return FactorPanel(panel.names, _zscore_kernel_compiled(panel.data, np.empty_like(panel.data)))
+    
+    # Sum of squares per row without materializing the squared matrix
+    centered = panel.data - panel.data.mean(axis=1, keepdims=True)
+    var = np.einsum('kn,kn->k', centered, centered)[:, None] / panel.data.shape[1]
+    std = np.sqrt(var)
+    return FactorPanel(panel.names, np.divide(centered, std, out=np.zeros_like(centered), where=std > 0))
+
+
+def build_factor_matrix(factor_scores: Union[Dict[str, np.ndarray], FactorPanel],
+                        tilt_coefficients: Dict[str, float],
+                        order: Optional[Tuple[str, ...]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Align tilt coefficients with the rows of a factor panel
+    
+    Factors without a coefficient get 0.0, so the tilt is one product over
+    the whole panel with no per-factor checks. Build once per rebalance and
+    reuse with apply_mu_tilt across portfolios.
+    
+    Args:
+        factor_scores: Factor panel, or dictionary of factor scores for each factor
+        tilt_coefficients: Dictionary of tilt coefficients for each factor
+        order: Row order when factor_scores is a dictionary
+        
+    Returns:
+        Tuple of (factor_matrix, coef_vec); factor_matrix is the panel data itself
+    """
+    if not isinstance(factor_scores, FactorPanel):
+        factor_scores = FactorPanel.from_dict(factor_scores, order)
+    
+    coef_vec = np.fromiter((tilt_coefficients.get(name, 0.0) for name in factor_scores.names),
+                           dtype=factor_scores.data.dtype, count=len(factor_scores))
+    
+    return factor_scores.data, coef_vec
+
+
+def apply_mu_tilt(base_returns: np.ndarray, factor_matrix: np.ndarray, coef_vec: np.ndarray,
+                  out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Apply a stacked factor tilt to base returns with a single matrix-vector product
+    
+    Args:
+        base_returns: Base expected returns for assets
+        factor_matrix: Factor scores, shape (n_factors, n_assets)
+        coef_vec: Tilt coefficients, shape (n_factors,)
+        out: Optional output buffer of the same shape as base_returns
+        
+    Returns:
+        Tilted expected returns
+    """
+    if out is None:
+        out = np.empty_like(base_returns, dtype=np.result_type(base_returns, factor_matrix))
+    if _mu_tilt_kernel_compiled is not None:
+        return _mu_tilt_kernel_compiled(base_returns, np.ascontiguousarray(factor_matrix), coef_vec, out)
+    
+    # Tile the asset axis so each (n_factors, block) slice plus its base and
+    # output chunks stay in cache while the block is reduced
+    n_assets = base_returns.shape[0]
+    block = max(_TILT_BLOCK_BYTES // (factor_matrix.itemsize * (len(coef_vec) + 2)), 1)
+    if n_assets <= block:
+        return np.add(base_returns, coef_vec @ factor_matrix, out=out)
+    
+    for start in range(0, n_assets, block):
+        stop = min(start + block, n_assets)
+        np.add(base_returns[start:stop], coef_vec @ factor_matrix[:, start:stop], out=out[start:stop])
+    
+    return out
+
+
+def calculate_mu_tilt(base_returns: np.ndarray,
+                     factor_scores: Union[Dict[str, np.ndarray], FactorPanel], 
+                     tilt_coefficients: Dict[str, float],
+                     out: Optional[np.ndarray] = None) -> np.ndarray:
     """
     Calculate tilted expected returns based on factor scores
     
     Args:
         base_returns: Base expected returns for assets
-        factor_scores: Dictionary of factor scores (z-scores) for each factor
+        factor_scores: Dictionary of factor scores (z-scores) for each factor,
+            or a FactorPanel
         tilt_coefficients: Dictionary of tilt coefficients for each factor
+        out: Optional output buffer, e.g. reused across rebalance dates
         
     Returns:
-        Tilted expected returns
+        Tilted expected returns (out, if given)
     """
-    tilted_returns = base_returns.copy()
+    if len(factor_scores) == 0:
+        if out is None:
+            return base_returns.copy()
+        np.copyto(out, base_returns)
+        return out
     
-    for factor_name, scores in factor_scores.items():
-        if factor_name in tilt_coefficients:
-            coefficient = tilt_coefficients[factor_name]
-            # Apply tilt: positive coefficient increases return for positive scores
-            tilt_adjustment = coefficient * scores
-            tilted_returns += tilt_adjustment
+    factor_matrix, coef_vec = build_factor_matrix(factor_scores, tilt_coefficients)
     
-    return tilted_returns
+    # Positive coefficient increases return for positive scores
+    return apply_mu_tilt(base_returns, factor_matrix, coef_vec, out=out)
 
 
 def normalize_factor_scores(raw_scores: np.ndarray, method: str = "zscore") -> np.ndarray:
@@ -48,18 +227,23 @@ def normalize_factor_scores(raw_scores: np.ndarray, method: str = "zscore") -> n
         Normalized scores
     """
     if method == "zscore":
-        mean_score = np.mean(raw_scores)
-        std_score = np.std(raw_scores)
+        # Reuse the centered scores for the variance rather than letting
+        # np.std recompute the mean, and normalize them in place
+        centered = raw_scores - np.mean(raw_scores)
+        std_score = np.sqrt(centered @ centered / len(centered))
         if std_score > 0:
-            return (raw_scores - mean_score) / std_score
+            centered /= std_score
+            return centered
         else:
             return np.zeros_like(raw_scores)
     
     elif method == "rank":
-        # Convert to percentile ranks and then to z-scores
-        from scipy import stats
-        ranks = stats.rankdata(raw_scores) / len(raw_scores)
-        return stats.norm.ppf(np.clip(ranks, 0.01, 0.99))
+        # Convert to percentile ranks (ties share their average rank) and then to z-scores
+        _, inverse, counts = np.unique(raw_scores, return_inverse=True, return_counts=True)
+        ranks = (np.cumsum(counts) - 0.5 * (counts - 1))[inverse.reshape(-1)]
+        frac = ranks / len(raw_scores)
+        np.clip(frac, 0.01, 0.99, out=frac)
+        return ndtri(frac).astype(np.result_type(raw_scores, np.float32), copy=False)
     
     elif method == "minmax":
         min_val, max_val = np.min(raw_scores), np.max(raw_scores)
@@ -72,10 +256,19 @@ def normalize_factor_scores(raw_scores: np.ndarray, method: str = "zscore") -> n
         raise ValueError(f"Unknown normalization method: {method}")
 
 
+def _read_only(arr: np.ndarray) -> np.ndarray:
+    """Lock a fixture array against in-place modification"""
+    arr.flags.writeable = False
+    return arr
+
+
 class TestMuTilt:
     """Test class for mu tilt functionality"""
     
-    @pytest.fixture
+    # Fixtures are built once per module and shared read-only between tests;
+    # a test that needs to modify one must copy it first
+    
+    @pytest.fixture(scope="module")
     def sample_data(self):
         """Create sample data for testing"""
         np.random.seed(42)
@@ -90,23 +283,31 @@ class TestMuTilt:
         quality_scores = np.random.normal(0, 1, n_assets)
         
         # Factor coefficients
-        tilt_coefficients = {
+        tilt_coefficients = MappingProxyType({
             "momentum": 0.02,
             "value": 0.015,
             "quality": 0.01
-        }
+        })
         
         return {
-            "base_returns": base_returns,
-            "raw_factors": {
-                "momentum": momentum_scores,
-                "value": value_scores,
-                "quality": quality_scores
-            },
+            "base_returns": _read_only(base_returns),
+            "raw_factors": MappingProxyType({
+                "momentum": _read_only(momentum_scores),
+                "value": _read_only(value_scores),
+                "quality": _read_only(quality_scores)
+            }),
             "tilt_coefficients": tilt_coefficients,
             "n_assets": n_assets
         }
     
+    @pytest.fixture(scope="module")
+    def normalized_factors(self, sample_data):
+        """Z-score every raw factor once for the tilt tests"""
+        return MappingProxyType({
+            name: _read_only(normalize_factor_scores(scores, "zscore"))
+            for name, scores in sample_data["raw_factors"].items()
+        })
+    
     def test_normalize_factor_scores_zscore(self, sample_data):
         """Test z-score normalization of factor scores"""
         raw_scores = sample_data["raw_factors"]["momentum"]
@@ -141,18 +342,13 @@ class TestMuTilt:
         assert abs(np.min(normalized) + 1.0) < 1e-10  # Should be exactly -1
         assert abs(np.max(normalized) - 1.0) < 1e-10   # Should be exactly 1
     
-    def test_calculate_mu_tilt_basic(self, sample_data):
+    def test_calculate_mu_tilt_basic(self, sample_data, normalized_factors):
         """Test basic mu tilt calculation"""
         base_returns = sample_data["base_returns"]
         tilt_coefficients = sample_data["tilt_coefficients"]
         
-        # Normalize factor scores
-        factor_scores = {}
-        for factor_name, raw_scores in sample_data["raw_factors"].items():
-            factor_scores[factor_name] = normalize_factor_scores(raw_scores, "zscore")
-        
         # Calculate tilted returns
-        tilted_returns = calculate_mu_tilt(base_returns, factor_scores, tilt_coefficients)
+        tilted_returns = calculate_mu_tilt(base_returns, normalized_factors, tilt_coefficients)
         
         # Check basic properties
         assert len(tilted_returns) == len(base_returns)
@@ -161,7 +357,7 @@ class TestMuTilt:
         # Returns should be modified (unless all factor scores are zero)
         assert not np.allclose(tilted_returns, base_returns)
     
-    def test_calculate_mu_tilt_zero_coefficients(self, sample_data):
+    def test_calculate_mu_tilt_zero_coefficients(self, sample_data, normalized_factors):
         """Test mu tilt with zero coefficients (no tilt)"""
         base_returns = sample_data["base_returns"]
         
@@ -172,23 +368,17 @@ class TestMuTilt:
             "quality": 0.0
         }
         
-        factor_scores = {}
-        for factor_name, raw_scores in sample_data["raw_factors"].items():
-            factor_scores[factor_name] = normalize_factor_scores(raw_scores, "zscore")
-        
-        tilted_returns = calculate_mu_tilt(base_returns, factor_scores, zero_coefficients)
+        tilted_returns = calculate_mu_tilt(base_returns, normalized_factors, zero_coefficients)
         
         # Should be identical to base returns
         np.testing.assert_array_almost_equal(tilted_returns, base_returns)
     
-    def test_calculate_mu_tilt_single_factor(self, sample_data):
+    def test_calculate_mu_tilt_single_factor(self, sample_data, normalized_factors):
         """Test mu tilt with single factor"""
         base_returns = sample_data["base_returns"]
         
         # Only momentum factor
-        momentum_scores = normalize_factor_scores(
-            sample_data["raw_factors"]["momentum"], "zscore"
-        )
+        momentum_scores = normalized_factors["momentum"]
         
         factor_scores = {"momentum": momentum_scores}
         tilt_coefficients = {"momentum": 0.02}
@@ -200,14 +390,22 @@ class TestMuTilt:
         
         np.testing.assert_array_almost_equal(tilted_returns, expected_tilt)
     
-    def test_calculate_mu_tilt_missing_factor(self, sample_data):
+    def test_build_factor_matrix_zero_fills_coefficients(self, sample_data):
+        """Test that factors without a coefficient are aligned with a zero coefficient"""
+        panel = FactorPanel.from_dict(sample_data["raw_factors"], order=("value", "momentum", "quality"))
+        assert panel.names == ("value", "momentum", "quality")
+        
+        factor_matrix, coef_vec = build_factor_matrix(panel, {"momentum": 0.02, "size": 0.5})
+        
+        assert factor_matrix is panel.data
+        np.testing.assert_array_equal(coef_vec, [0.0, 0.02, 0.0])
+    
+    def test_calculate_mu_tilt_missing_factor(self, sample_data, normalized_factors):
         """Test mu tilt when factor score is missing"""
         base_returns = sample_data["base_returns"]
         
         # Only provide momentum scores, but coefficients include value
-        momentum_scores = normalize_factor_scores(
-            sample_data["raw_factors"]["momentum"], "zscore"
-        )
+        momentum_scores = normalized_factors["momentum"]
         
         factor_scores = {"momentum": momentum_scores}
         tilt_coefficients = {"momentum": 0.02, "value": 0.015}  # value missing
@@ -218,6 +416,109 @@ class TestMuTilt:
         expected_tilt = base_returns + 0.02 * momentum_scores
         np.testing.assert_array_almost_equal(tilted_returns, expected_tilt)
     
+    def test_apply_mu_tilt_matches_per_factor_sum(self, sample_data):
+        """Test stacked factor tilt against the per-factor accumulation"""
+        base_returns = sample_data["base_returns"]
+        tilt_coefficients = sample_data["tilt_coefficients"]
+        factor_scores = sample_data["raw_factors"]
+        
+        factor_matrix, coef_vec = build_factor_matrix(factor_scores, tilt_coefficients)
+        assert factor_matrix.shape == (3, sample_data["n_assets"])
+        
+        expected = base_returns.copy()
+        for name, scores in factor_scores.items():
+            expected += tilt_coefficients[name] * scores
+        
+        # Reusing the output buffer gives the same result
+        out = np.empty_like(base_returns)
+        result = apply_mu_tilt(base_returns, factor_matrix, coef_vec, out=out)
+        assert result is out
+        np.testing.assert_array_almost_equal(out, expected)
+    
+    def test_calculate_mu_tilt_reuses_buffer(self, sample_data, normalized_factors):
+        """Test that a preallocated output buffer is filled and returned"""
+        base_returns = sample_data["base_returns"]
+        tilt_coefficients = sample_data["tilt_coefficients"]
+        
+        buf = np.empty_like(base_returns)
+        for factor_scores in (normalized_factors, {}):
+            expected = calculate_mu_tilt(base_returns, factor_scores, tilt_coefficients)
+            result = calculate_mu_tilt(base_returns, factor_scores, tilt_coefficients, out=buf)
+            assert result is buf
+            np.testing.assert_array_equal(buf, expected)
+    
+    def test_apply_mu_tilt_blocked(self, sample_data, monkeypatch):
+        """Test that the tiled tilt matches the single product"""
+        panel = FactorPanel.from_dict(sample_data["raw_factors"])
+        base_returns = sample_data["base_returns"]
+        coef_vec = np.array([0.02, 0.015, 0.01])
+        expected = base_returns + coef_vec @ panel.data
+        
+        # Tiles of 2 assets, including a ragged last tile
+        monkeypatch.setitem(globals(), "_TILT_BLOCK_BYTES", 2 * 8 * 5)
+        np.testing.assert_array_almost_equal(apply_mu_tilt(base_returns, panel.data, coef_vec), expected)
+        monkeypatch.setitem(globals(), "_TILT_BLOCK_BYTES", 3 * 8 * 5)
+        np.testing.assert_array_almost_equal(apply_mu_tilt(base_returns, panel.data, coef_vec), expected)
+    
+    def test_zscore_panel_matches_per_factor(self, sample_data, normalized_factors):
+        """Test panel z-scoring against per-factor normalization"""
+        panel = FactorPanel.from_dict(sample_data["raw_factors"])
+        assert panel.data.shape == (3, sample_data["n_assets"])
+        assert panel.data.flags.c_contiguous
+        
+        normalized = zscore_panel(panel)
+        
+        assert normalized.names == panel.names
+        for name, scores in normalized.to_dict().items():
+            np.testing.assert_array_almost_equal(scores, normalized_factors[name])
+        
+        # Tilting with the panel matches tilting with the dict
+        np.testing.assert_array_almost_equal(
+            calculate_mu_tilt(sample_data["base_returns"], normalized, sample_data["tilt_coefficients"]),
+            calculate_mu_tilt(sample_data["base_returns"], normalized.to_dict(), sample_data["tilt_coefficients"]),
+        )
+    
+    def test_kernels_match_numpy(self, sample_data):
+        """Test the loop kernels used for compilation against the NumPy expressions"""
+        panel = FactorPanel.from_dict(sample_data["raw_factors"])
+        base_returns = sample_data["base_returns"]
+        coef_vec = np.array([0.02, 0.015, 0.01])
+        
+        tilted = _mu_tilt_kernel(base_returns, panel.data, coef_vec, np.empty_like(base_returns))
+        np.testing.assert_array_almost_equal(tilted, base_returns + coef_vec @ panel.data)
+        
+        zscores = _zscore_kernel(panel.data, np.empty_like(panel.data))
+        np.testing.assert_array_almost_equal(zscores, zscore_panel(panel).data)
+    
+    def test_float32_pipeline_preserves_dtype(self, sample_data):
+        """Test that float32 inputs stay float32 through normalization and tilt"""
+        raw_factors = {name: scores.astype(np.float32) for name, scores in sample_data["raw_factors"].items()}
+        base_returns = sample_data["base_returns"].astype(np.float32)
+        
+        for method in ("zscore", "rank", "minmax"):
+            assert normalize_factor_scores(raw_factors["momentum"], method).dtype == np.float32
+        
+        panel = zscore_panel(FactorPanel.from_dict(raw_factors))
+        assert panel.data.dtype == np.float32
+        
+        tilted = calculate_mu_tilt(base_returns, panel, sample_data["tilt_coefficients"])
+        assert tilted.dtype == np.float32
+        
+        expected = calculate_mu_tilt(
+            sample_data["base_returns"], zscore_panel(FactorPanel.from_dict(sample_data["raw_factors"])),
+            sample_data["tilt_coefficients"]
+        )
+        np.testing.assert_allclose(tilted, expected, rtol=1e-5)
+    
+    def test_factor_panel_identity_semantics(self, sample_data):
+        """Test that FactorPanel compares and hashes without touching its data"""
+        panel = FactorPanel.from_dict(sample_data["raw_factors"])
+        other = FactorPanel.from_dict(sample_data["raw_factors"])
+        
+        assert panel == panel
+        assert panel != other
+        assert len({panel, other}) == 2
+    
     def test_factor_score_extreme_values(self):
         """Test factor score normalization with extreme values"""
         # Create data with outliers
@@ -9,15 +9,167 @@ and constrained optimization.
 import pytest
 import numpy as np
 import cvxpy as cp
+import osqp
+from collections import OrderedDict
+from scipy import sparse
+from scipy.linalg import cho_factor, cho_solve
+from scipy.linalg.blas import dsymv, dtrmv
 from typing import Dict, Tuple, Optional
 from scipy.optimize import minimize
 
 
+class _SigmaCache:
+    """
+    LRU cache of Cholesky factors keyed by covariance matrix contents
+    
+    Optimization, frontier and metrics calls for the same covariance matrix
+    share one factorization instead of each inverting or multiplying by
+    sigma from scratch.
+    """
+    
+    def __init__(self, maxsize: int = 32):
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+    
+    @staticmethod
+    def _key(sigma: np.ndarray):
+        # The raw bytes themselves, not their hash, so a hash collision falls
+        # back to an equality check instead of returning another matrix's factor
+        return sigma.dtype.str, sigma.shape, sigma.tobytes()
+    
+    def factor(self, sigma: np.ndarray) -> Optional[Tuple[np.ndarray, bool]]:
+        """
+        Cholesky factor of sigma, computed on a cache miss
+        
+        Args:
+            sigma: Covariance matrix
+            
+        Returns:
+            (c, lower) as returned by cho_factor, or None if sigma is not
+            positive definite
+        """
+        key = self._key(sigma)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        
+        try:
+            c, lower = cho_factor(sigma, lower=True)
+            c.flags.writeable = False
+            factor = (c, lower)
+        except np.linalg.LinAlgError:
+            factor = None
+        
+        self._entries[key] = factor
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        
+        return factor
+
+
+_SIGMA_CACHE = _SigmaCache()
+
+
+def _quadratic_form(weights: np.ndarray, factor: Tuple[np.ndarray, bool]) -> float:
+    """w' sigma w as ||L' w||^2 from the lower Cholesky factor L of sigma"""
+    y = dtrmv(factor[0], weights, lower=1, trans=1)
+    return float(y @ y)
+
+
+def _closed_form_weights(mu: np.ndarray, sigma: np.ndarray,
+                         risk_aversion: float) -> Optional[np.ndarray]:
+    """
+    Mean-variance weights subject only to the budget constraint
+    
+    w = sigma^-1 (mu - lambda 1) / risk_aversion, with lambda chosen so the
+    weights sum to one. When these weights also satisfy the bounds they are
+    the optimum of the bounded problem.
+    
+    Args:
+        mu: Expected returns vector
+        sigma: Covariance matrix
+        risk_aversion: Risk aversion parameter
+        
+    Returns:
+        Weights, or None if sigma is not positive definite
+    """
+    factor = _SIGMA_CACHE.factor(sigma)
+    if factor is None:
+        return None
+    
+    solved = cho_solve(factor, np.column_stack((np.ones(len(mu)), mu)))
+    sinv_one, sinv_mu = solved[:, 0], solved[:, 1]
+    lam = (sinv_mu.sum() - risk_aversion) / sinv_one.sum()
+    
+    return (sinv_mu - lam * sinv_one) / risk_aversion
+
+
+# OSQP workspaces keyed by asset count, most recently used last
+_MV_WORKSPACES: OrderedDict = OrderedDict()
+_MV_WORKSPACES_MAXSIZE = 32
+
+
+def _solve_mv_qp(mu: np.ndarray, sigma: np.ndarray, risk_aversion: float,
+                 lower: np.ndarray, upper: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Solve the bounded mean-variance QP with a cached OSQP workspace
+    
+    The matrices only depend on the asset count; sigma, mu and the bounds
+    are updated in place on later calls, warm-starting from the last solution.
+    
+    Args:
+        mu: Expected returns vector
+        sigma: Covariance matrix
+        risk_aversion: Risk aversion parameter
+        lower: Per-asset lower bounds
+        upper: Per-asset upper bounds
+        
+    Returns:
+        Optimal weights, or None if OSQP does not solve the problem
+    """
+    n = len(mu)
+    
+    # Full upper triangle of P = risk_aversion * sigma in CSC order, so the
+    # sparsity pattern never changes even when sigma has zero entries
+    cols, rows = np.tril_indices(n)
+    Px = risk_aversion * sigma[rows, cols]
+    l = np.concatenate((np.ones(1), lower))
+    u = np.concatenate((np.ones(1), upper))
+    
+    entry = _MV_WORKSPACES.get(n)
+    if entry is None:
+        P = sparse.csc_matrix((Px, (rows, cols)), shape=(n, n))
+        # Constraint rows: fully invested, then per-asset bounds
+        A = sparse.vstack([sparse.csc_matrix(np.ones((1, n))), sparse.eye(n, format='csc')], format='csc')
+        problem = osqp.OSQP()
+        problem.setup(P, -mu, A, l, u, verbose=False, eps_abs=1e-8, eps_rel=1e-8, polishing=True)
+        entry = [problem, None, None]
+        _MV_WORKSPACES[n] = entry
+        if len(_MV_WORKSPACES) > _MV_WORKSPACES_MAXSIZE:
+            _MV_WORKSPACES.popitem(last=False)
+    else:
+        _MV_WORKSPACES.move_to_end(n)
+        problem = entry[0]
+        problem.update(Px=Px, q=-mu, l=l, u=u)
+        if entry[1] is not None:
+            problem.warm_start(x=entry[1], y=entry[2])
+    
+    result = problem.solve(raise_error=False)
+    if result.info.status_val != osqp.SolverStatus.OSQP_SOLVED:
+        return None
+    
+    entry[1], entry[2] = result.x.copy(), result.y.copy()
+    return result.x
+
+
 def mean_variance_optimize(mu: np.ndarray, sigma: np.ndarray, 
                           risk_aversion: float = 3.0,
                           constraints: Optional[Dict] = None) -> np.ndarray:
     """
-    Mean-variance portfolio optimization using CVXPY
+    Mean-variance portfolio optimization
+    
+    Uses the closed-form budget-constrained solution when it already
+    satisfies the bounds, and a cached OSQP workspace otherwise.
     
     Args:
         mu: Expected returns vector
@@ -29,43 +181,35 @@ def mean_variance_optimize(mu: np.ndarray, sigma: np.ndarray,
         Optimal portfolio weights
     """
     n = len(mu)
-    w = cp.Variable(n, name="weights")
-    
-    # Mean-variance objective
-    portfolio_return = mu.T @ w
-    portfolio_risk = cp.quad_form(w, sigma)
-    objective = cp.Maximize(portfolio_return - 0.5 * risk_aversion * portfolio_risk)
-    
-    # Basic constraints
-    constraints_list = [
-        cp.sum(w) == 1,  # Fully invested
-        w >= 0,  # Long-only
-    ]
-    
-    # Additional constraints
-    if constraints:
-        if "max_weight" in constraints:
-            constraints_list.append(w <= constraints["max_weight"])
-        if "min_weight" in constraints:
-            constraints_list.append(w >= constraints["min_weight"])
-        if "leverage_limit" in constraints:
-            constraints_list.append(cp.norm(w, 1) <= constraints["leverage_limit"])
-    
-    # Solve optimization
-    problem = cp.Problem(objective, constraints_list)
-    
-    try:
-        problem.solve(solver=cp.ECOS, verbose=False)
-        
-        if problem.status == cp.OPTIMAL:
-            return w.value
-        else:
-            # Return equal weights if optimization fails
-            return np.ones(n) / n
-            
-    except Exception:
-        # Return equal weights if solving fails
+    mu = np.asarray(mu, dtype=float)
+    sigma = np.asarray(sigma, dtype=float)
+    constraints = constraints or {}
+    
+    # Long-only and fully invested, so the L1 norm of the weights is always 1
+    if constraints.get("leverage_limit", np.inf) < 1:
+        return np.ones(n) / n
+    
+    min_weight = max(constraints.get("min_weight", 0.0), 0.0)
+    max_weight = constraints.get("max_weight", np.inf)
+    
+    # Bounds that cannot add up to a fully invested portfolio are rejected
+    # before any solve
+    if n * min_weight > 1 or n * max_weight < 1 or min_weight > max_weight:
+        return np.ones(n) / n
+    
+    lower = np.full(n, min_weight)
+    upper = np.full(n, max_weight)
+    
+    weights = _closed_form_weights(mu, sigma, risk_aversion)
+    if weights is not None and np.all(weights >= lower) and np.all(weights <= upper):
+        return weights
+    
+    weights = _solve_mv_qp(mu, sigma, risk_aversion, lower, upper)
+    if weights is None:
+        # Return equal weights if optimization fails
         return np.ones(n) / n
+    
+    return weights
 
 
 def calculate_portfolio_metrics(weights: np.ndarray, mu: np.ndarray, 
@@ -82,7 +226,9 @@ def calculate_portfolio_metrics(weights: np.ndarray, mu: np.ndarray,
         Dictionary of portfolio metrics
     """
     portfolio_return = float(np.dot(weights, mu))
-    portfolio_variance = float(np.dot(weights, np.dot(sigma, weights)))
+    w = np.asarray(weights, dtype=float)
+    # Symmetric matrix-vector product, reading only the lower triangle
+    portfolio_variance = float(w @ dsymv(1.0, sigma, w, lower=1))
     portfolio_volatility = float(np.sqrt(portfolio_variance))
     
     # Sharpe ratio (assuming risk-free rate = 0)
@@ -121,11 +267,14 @@ def efficient_frontier(mu: np.ndarray, sigma: np.ndarray,
     
     # Calculate minimum variance portfolio
     ones = np.ones(n)
-    sigma_inv = np.linalg.inv(sigma)
+    factor = _SIGMA_CACHE.factor(sigma)
+    if factor is None:
+        raise np.linalg.LinAlgError("Covariance matrix is not positive definite")
+    solved = cho_solve(factor, np.column_stack((ones, mu)))
+    sinv_one, sinv_mu = solved[:, 0], solved[:, 1]
     
     # Minimum variance weights
-    w_min_var = sigma_inv @ ones / (ones.T @ sigma_inv @ ones)
-    min_var = float(np.dot(w_min_var, np.dot(sigma, w_min_var)))
+    w_min_var = sinv_one / (ones @ sinv_one)
     min_return = float(np.dot(w_min_var, mu))
     
     # Maximum return (unconstrained except sum=1)
@@ -134,38 +283,67 @@ def efficient_frontier(mu: np.ndarray, sigma: np.ndarray,
     # Generate target returns
     target_returns = np.linspace(min_return, max_return, num_points)
     
-    risks = []
-    returns = []
+    # Without the long-only constraint the frontier is known in closed form:
+    # w(r) is affine in r and sigma^2(r) = (a r^2 - 2 b r + c) / d. Wherever
+    # those weights are non-negative they are also the long-only optimum.
+    a = ones @ sinv_one
+    b = ones @ sinv_mu
+    c = mu @ sinv_mu
+    d = a * c - b * b
     
-    for target_ret in target_returns:
-        try:
-            # Minimize variance subject to target return
-            w = cp.Variable(n)
-            objective = cp.Minimize(cp.quad_form(w, sigma))
-            constraints = [
-                cp.sum(w) == 1,
-                w >= 0,
-                mu.T @ w == target_ret
-            ]
-            
-            problem = cp.Problem(objective, constraints)
-            problem.solve(solver=cp.ECOS, verbose=False)
+    risks = np.full(num_points, np.nan)
+    if d > 1e-12 * a * c:
+        frontier_weights = (np.outer(c - b * target_returns, sinv_one)
+                            + np.outer(a * target_returns - b, sinv_mu)) / d
+        analytic = np.all(frontier_weights >= 0, axis=1)
+        variances = (a * target_returns**2 - 2 * b * target_returns + c) / d
+        risks[analytic] = np.sqrt(np.maximum(variances[analytic], 0.0))
+    else:
+        analytic = np.zeros(num_points, dtype=bool)
+    
+    # Remaining targets have an active long-only bound and need a QP. The
+    # problem is built once with the target as a parameter and re-solved
+    # per target, warm-starting from the neighbouring solution
+    remaining = np.flatnonzero(~analytic)
+    if len(remaining) > 0:
+        w = cp.Variable(n)
+        target = cp.Parameter()
+        # Minimize variance subject to target return
+        objective = cp.Minimize(cp.quad_form(w, cp.psd_wrap(sigma)))
+        constraints = [
+            cp.sum(w) == 1,
+            w >= 0,
+            mu @ w == target
+        ]
+        problem = cp.Problem(objective, constraints)
+        
+        for i in remaining:
+            target.value = target_returns[i]
+            try:
+                problem.solve(solver=cp.ECOS, warm_start=True, verbose=False)
+            except cp.error.SolverError:
+                continue
             
             if problem.status == cp.OPTIMAL:
-                portfolio_risk = float(np.sqrt(np.dot(w.value, np.dot(sigma, w.value))))
-                risks.append(portfolio_risk)
-                returns.append(target_ret)
-                
-        except Exception:
-            continue
-    
-    return np.array(risks), np.array(returns)
+                risks[i] = np.sqrt(_quadratic_form(w.value, factor))
+    
+    solved = ~np.isnan(risks)
+    return risks[solved], target_returns[solved]
+
+
+def _read_only(arr: np.ndarray) -> np.ndarray:
+    """Lock a fixture array against in-place modification"""
+    arr.flags.writeable = False
+    return arr
 
 
 class TestMeanVarianceOptimization:
     """Test class for mean-variance optimization"""
     
-    @pytest.fixture
+    # Fixtures are built once per module and shared read-only between tests;
+    # a test that needs to modify one must copy it first
+    
+    @pytest.fixture(scope="module")
     def sample_data(self):
         """Create sample data for testing"""
         np.random.seed(42)
@@ -179,8 +357,9 @@ class TestMeanVarianceOptimization:
         sigma = A @ A.T + np.eye(n_assets) * 0.01  # Add small regularization
         
         return {
-            "mu": mu,
-            "sigma": sigma,
+            "mu": _read_only(mu),
+            "sigma": _read_only(sigma),
+            "chol": _read_only(np.linalg.cholesky(sigma)),
             "n_assets": n_assets
         }
     
@@ -230,6 +409,52 @@ class TestMeanVarianceOptimization:
         assert np.all(weights <= constraints["max_weight"] + 1e-6)
         assert abs(np.sum(weights) - 1.0) < 1e-6
     
+    def test_workspace_reused_across_calls(self, sample_data):
+        """Test that bounded solves of the same size reuse the OSQP workspace"""
+        mu = sample_data["mu"]
+        sigma = sample_data["sigma"]
+        constraints = {"max_weight": 0.3}
+        
+        _MV_WORKSPACES.clear()
+        w_first = mean_variance_optimize(mu, sigma, risk_aversion=3.0, constraints=constraints)
+        workspace = _MV_WORKSPACES[len(mu)][0]
+        w_second = mean_variance_optimize(mu[::-1].copy(), sigma, risk_aversion=5.0, constraints=constraints)
+        
+        assert _MV_WORKSPACES[len(mu)][0] is workspace
+        assert not np.allclose(w_first, w_second)
+        # Re-solving the first inputs reproduces the first weights
+        np.testing.assert_allclose(
+            mean_variance_optimize(mu, sigma, risk_aversion=3.0, constraints=constraints), w_first, atol=1e-6
+        )
+    
+    def test_closed_form_matches_qp(self):
+        """Test the closed-form path against the QP when no bound is active"""
+        mu = np.array([0.05, 0.10, 0.15])
+        sigma = np.array([
+            [0.01, 0.00, 0.00],
+            [0.00, 0.04, 0.00],
+            [0.00, 0.00, 0.25]
+        ])
+        
+        closed_form = _closed_form_weights(mu, sigma, 100.0)
+        assert np.all(closed_form > 0)
+        
+        qp = _solve_mv_qp(mu, sigma, 100.0, np.zeros(3), np.full(3, np.inf))
+        np.testing.assert_allclose(closed_form, qp, atol=1e-6)
+    
+    def test_mean_variance_infeasible_bounds(self, sample_data):
+        """Test that infeasible weight bounds fall back to equal weights without solving"""
+        mu = sample_data["mu"]
+        sigma = sample_data["sigma"]
+        n = len(mu)
+        
+        _MV_WORKSPACES.clear()
+        for constraints in ({"min_weight": 0.25}, {"max_weight": 0.1}):
+            weights = mean_variance_optimize(mu, sigma, constraints=constraints)
+            np.testing.assert_allclose(weights, np.ones(n) / n)
+        
+        assert len(_MV_WORKSPACES) == 0
+    
     def test_portfolio_metrics_calculation(self, sample_data):
         """Test portfolio metrics calculation"""
         mu = sample_data["mu"]
@@ -249,6 +474,31 @@ class TestMeanVarianceOptimization:
         assert metrics["hhi"] == pytest.approx(1.0 / n, abs=1e-10)  # Equal weights HHI
         assert metrics["effective_assets"] == pytest.approx(n, abs=1e-10)
     
+    def test_portfolio_metrics_variance(self, sample_data):
+        """Test portfolio variance from the symmetric matrix-vector product"""
+        mu = sample_data["mu"]
+        sigma = sample_data["sigma"]
+        weights = np.array([0.1, 0.2, 0.3, 0.15, 0.25])
+        
+        metrics = calculate_portfolio_metrics(weights, mu, sigma)
+        assert metrics["variance"] == pytest.approx(float(weights @ sigma @ weights), rel=1e-12)
+    
+    def test_sigma_cache_keys_on_contents(self, sample_data):
+        """Test that the factor cache only reuses a factor for an equal matrix"""
+        sigma = sample_data["sigma"]
+        cache = _SigmaCache()
+        
+        factor = cache.factor(sigma)
+        assert cache.factor(sigma.copy()) is factor
+        
+        shifted = sigma + np.eye(len(sigma)) * 1e-3
+        shifted_factor = cache.factor(shifted)
+        assert shifted_factor is not factor
+        assert np.allclose(np.tril(shifted_factor[0]) @ np.tril(shifted_factor[0]).T, shifted)
+        
+        # The same bytes under another dtype are a different matrix
+        assert cache._key(sigma.view(np.int64)) != cache._key(sigma)
+    
     def test_efficient_frontier_generation(self, sample_data):
         """Test efficient frontier generation"""
         mu = sample_data["mu"]
@@ -266,6 +516,21 @@ class TestMeanVarianceOptimization:
         # This may not be strictly true due to numerical issues
         assert len(risks) <= 10  # At most the requested number
     
+    def test_efficient_frontier_matches_qp(self):
+        """Test closed-form frontier points against per-target QP solves"""
+        mu = np.array([0.06, 0.08, 0.10, 0.12])
+        sigma = np.diag([0.02, 0.03, 0.04, 0.05]) + 0.005
+        
+        risks, returns = efficient_frontier(mu, sigma, num_points=10)
+        assert len(risks) == 10
+        
+        for risk, target in zip(risks, returns):
+            w = cp.Variable(len(mu))
+            problem = cp.Problem(cp.Minimize(cp.quad_form(w, sigma)),
+                                 [cp.sum(w) == 1, w >= 0, mu @ w == target])
+            problem.solve(solver=cp.ECOS)
+            assert risk == pytest.approx(np.sqrt(problem.value), abs=1e-6)
+    
     def test_optimization_edge_cases(self):
         """Test optimization with edge cases"""
         # Single asset case
@@ -306,8 +571,10 @@ class TestMeanVarianceOptimization:
         # Very low risk aversion (almost risk-neutral)
         weights = mean_variance_optimize(mu, sigma, risk_aversion=0.01)
         
-        # Should heavily weight the highest return asset
-        assert weights[2] > weights[1] > weights[0]  # Prefer higher return assets
+        # Should heavily weight the highest return asset; the exact optimum
+        # puts zero weight on both lower return assets
+        assert weights[2] > weights[1] > weights[0] - 1e-9  # Prefer higher return assets
+        assert weights[2] > 0.99
     
     def test_optimization_high_risk_aversion(self):
         """Test optimization with very high risk aversion"""
@@ -335,6 +602,10 @@ class TestMeanVarianceOptimization:
         eigenvals = np.linalg.eigvals(sigma)
         assert np.all(eigenvals >= -1e-10)  # Allow for small numerical errors
         
+        # The precomputed Cholesky factor reproduces sigma
+        chol = sample_data["chol"]
+        np.testing.assert_allclose(chol @ chol.T, sigma, atol=1e-12)
+        
         # Optimization should work with valid covariance matrix
         weights = mean_variance_optimize(mu, sigma)
         assert np.all(np.isfinite(weights))